@@ -0,0 +1,157 @@
+from datetime import timedelta
+import asyncio
+import math
+import time
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.config import get_admission_config
+from app.http_cache import VERSIONED_ROUTES
+from app.queries import params_bounds
+
+
+class Rejected(Exception):
+    """
+    Raised when a cost class cannot admit a request: its queue is full or the
+    request waited longer than the queue timeout.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class CostClass:
+    """
+    A bulkhead: at most ``limit`` requests of the class run at once and at
+    most ``queue_size`` more wait for a slot, each for up to ``queue_timeout``
+    seconds. Limits are per process.
+    """
+
+    def __init__(self, name, limit, queue_size, queue_timeout):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._held = 0.0  # moving average of how long a request holds a slot
+
+    def retry_after(self):
+        """
+        Seconds for the queue ahead to drain at the observed rate.
+        """
+        return max(1, math.ceil(self._held * (self.waiting + 1) / self.limit))
+
+    async def acquire(self):
+        if self._slots.locked():
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise Rejected(self.retry_after())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Rejected(self.retry_after())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        self.admitted += 1
+
+    def release(self, held: float):
+        self.active -= 1
+        self._slots.release()
+        self._held = held if not self._held else 0.8 * self._held + 0.2 * held
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_held_seconds": self._held,
+        }
+
+
+class Admission:
+    """
+    Sorts requests of the data endpoints into cost classes: "heavy" for the
+    routes of ADMISSION_HEAVY_ROUTES and for requests reading more than
+    ADMISSION_HEAVY_SPAN_DAYS, "cheap" for the point lookups.
+    """
+
+    def __init__(self):
+        self._classes = None
+
+    @property
+    def classes(self):
+        # Built on first use so the semaphores belong to the serving loop
+        if self._classes is None:
+            config = get_admission_config()
+            self._classes = {
+                name: CostClass(name, config[f"{name}_limit"], config[f"{name}_queue"], config["queue_timeout"])
+                for name in ("cheap", "heavy")
+            }
+        return self._classes
+
+    def classify(self, route, params):
+        config = get_admission_config()
+        if route in config["heavy_routes"]:
+            return self.classes["heavy"]
+        try:
+            start, end = params_bounds(params)
+        except ValueError:
+            # Answered with 400 without reading data
+            return self.classes["cheap"]
+        heavy = end - start > timedelta(days=config["heavy_span_days"])
+        return self.classes["heavy" if heavy else "cheap"]
+
+    def stats(self):
+        return {name: cost.stats() for name, cost in self.classes.items()}
+
+
+admission = Admission()
+
+
+class AdmissionMiddleware:
+    """
+    Runs each request of the data endpoints within the bulkhead of its cost
+    class, answering 429 with Retry-After when the class's queue is full, so
+    expensive range scans cannot starve the cheap lookups.
+    """
+
+    def __init__(self, app, prefix=""):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_admission_config()["enabled"]:
+            return await self.app(scope, receive, send)
+        route = scope["path"][len(self.prefix):].strip("/") if scope["path"].startswith(self.prefix) else None
+        if route not in VERSIONED_ROUTES:
+            return await self.app(scope, receive, send)
+
+        cost = admission.classify(route, Request(scope).query_params)
+        try:
+            await cost.acquire()
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": f"Too many {cost.name} requests in progress; retry later."},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            return await response(scope, receive, send)
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            cost.release(time.monotonic() - started)
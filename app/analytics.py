@@ -0,0 +1,261 @@
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import partial
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from app.config import get_analytics_config, get_rollup_config
+from app.db import execute_query, stream_query
+from app.periodic import PeriodicTask
+from app.services import get_table_info
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency of the analytics backend
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+_DAY_PREFIX = "day="
+
+
+def _bucket_expression(time_column: str, bucket):
+    if bucket == "hour":
+        return f"date_trunc('hour', {time_column})"
+    if bucket == "day":
+        return "day"
+    if bucket == "month":
+        return f"date_trunc('month', {time_column})"
+    if bucket is None:
+        return "NULL"
+    raise ValueError(f"Invalid bucket '{bucket}'.")
+
+
+class ParquetStore:
+    """
+    Closed days of the raw tables exported to Parquet and aggregated with
+    DuckDB, so long historical ranges do not scan the MySQL row store.
+
+    Each kind (see ROLLUP_SOURCES) is laid out as
+    ``<root>/<kind>/day=YYYY-MM-DD/source=<source>/*.parquet``. Days are
+    exported oldest first from the first raw row, each written to a temporary
+    directory and renamed into place, so the exported days always form one
+    contiguous range ``[first, end)`` that can be served from Parquet.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._db = duckdb.connect() if duckdb else None
+        self._coverage = {}  # kind -> (first day, end day, has files)
+        self._lock = threading.Lock()
+
+    def _kind_dir(self, kind):
+        return os.path.join(self.root, kind)
+
+    def load(self, kinds):
+        """
+        Read the exported days of every kind from disk.
+        """
+        for kind in kinds:
+            directory = self._kind_dir(kind)
+            days = sorted(
+                date.fromisoformat(name[len(_DAY_PREFIX):])
+                for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+                if name.startswith(_DAY_PREFIX)
+            )
+            # Only the contiguous run from the first day can be served
+            end = days[0] if days else None
+            for day in days:
+                if day != end:
+                    break
+                end = day + timedelta(days=1)
+            has_files = any(files for _, _, files in os.walk(directory))
+            with self._lock:
+                self._coverage[kind] = (days[0], end, has_files) if days else None
+
+    def coverage(self, kind):
+        """
+        ``(start, end)`` datetimes of the range served from Parquet, or None.
+        """
+        with self._lock:
+            coverage = self._coverage.get(kind)
+        if coverage is None:
+            return None
+        first, end, _ = coverage
+        return datetime.combine(first, datetime.min.time()), datetime.combine(end, datetime.min.time())
+
+    def export_day(self, kind, spec, day: date):
+        """
+        Copy the raw rows of ``day`` into its Parquet partition, by source.
+        """
+        time_column = spec["time_column"]
+        columns = spec["columns"]
+        table_info = get_table_info(spec["table_key"])
+        start = datetime.combine(day, datetime.min.time())
+
+        target = os.path.join(self._kind_dir(kind), f"{_DAY_PREFIX}{day.isoformat()}")
+        os.makedirs(self._kind_dir(kind), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".staging-{day.isoformat()}-", dir=self._kind_dir(kind))
+
+        cursor = self._db.cursor()
+        try:
+            metric_columns = ", ".join(f"{column} BIGINT" for column in columns)
+            cursor.execute(f"CREATE TEMP TABLE export_rows (source VARCHAR, {time_column} TIMESTAMP, {metric_columns})")
+            placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+            rows = stream_query(
+                f"""
+                SELECT source, {time_column}, {', '.join(columns)}
+                FROM {table_info['database']}.{table_info['table']}
+                WHERE {time_column} >= %s AND {time_column} < %s
+                """,
+                [start, start + timedelta(days=1)],
+                name=f"analytics.export.{kind}",
+            )
+            count = 0
+            try:
+                for chunk in rows:
+                    cursor.executemany(f"INSERT INTO export_rows VALUES ({placeholders})", chunk)
+                    count += len(chunk)
+            finally:
+                rows.close()
+            if count:
+                cursor.execute(
+                    f"COPY export_rows TO '{staging}' (FORMAT PARQUET, PARTITION_BY (source), OVERWRITE_OR_IGNORE)"
+                )
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        finally:
+            cursor.close()
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(staging, target)
+        with self._lock:
+            first, _, has_files = self._coverage.get(kind) or (day, None, False)
+            self._coverage[kind] = (first, day + timedelta(days=1), has_files or count > 0)
+        return count
+
+    @contextmanager
+    def _export_lock(self):
+        """
+        Yields whether this process holds the export lock of the store. Every
+        worker process runs an exporter; one exports at a time and the
+        others pick its days up from disk.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".export.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def export_pending(self, sources, now: datetime = None):
+        """
+        Export every closed day after the exported range: days that ended at
+        least the late-arrival grace ago. While another process is exporting,
+        only reload what it has written so far.
+        """
+        with self._export_lock() as exporting:
+            # Another process may have exported days since the last run
+            self.load(sources)
+            if exporting:
+                self._export_pending(sources, now)
+
+    def _export_pending(self, sources, now: datetime = None):
+        grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+        last_closed = ((now or datetime.now()) - grace).date()  # exclusive
+        for kind, spec in sources.items():
+            try:
+                coverage = self.coverage(kind)
+                if coverage is not None:
+                    day = coverage[1].date()
+                else:
+                    table_info = get_table_info(spec["table_key"])
+                    rows = execute_query(
+                        f"SELECT MIN({spec['time_column']}) FROM {table_info['database']}.{table_info['table']}",
+                        name=f"analytics.start.{kind}",
+                    )
+                    if not rows or rows[0][0] is None:
+                        continue
+                    day = rows[0][0].date()
+                while day < last_closed:
+                    count = self.export_day(kind, spec, day)
+                    logger.info(f"Exported {count} {kind} rows of {day} to Parquet")
+                    day += timedelta(days=1)
+            except Exception as e:
+                logger.error(f"Error exporting {kind} to Parquet: {str(e)}")
+
+    def aggregate(self, kind, spec, source, start: datetime, end: datetime, bucket, columns):
+        """
+        Sum ``columns`` over ``[start, end)`` (within the exported range) per
+        ``bucket``, as ``(bucket_key, *sums)`` rows like rollups.aggregate.
+        """
+        with self._lock:
+            coverage = self._coverage.get(kind)
+        if coverage is None or not coverage[2]:
+            return []
+        time_column = spec["time_column"]
+        filters, params = [
+            "day >= ? AND day < ?", f"{time_column} >= ? AND {time_column} < ?",
+        ], [start.date(), (end - timedelta(microseconds=1)).date() + timedelta(days=1), start, end]
+        if source not in (None, "", "all"):
+            filters.append("source = ?")
+            params.append(source)
+        group_by = "" if bucket is None else "GROUP BY bucket_key"
+        files = os.path.join(self._kind_dir(kind), f"{_DAY_PREFIX}*", "*", "*.parquet")
+        cursor = self._db.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT {_bucket_expression(time_column, bucket)} AS bucket_key,
+                       {', '.join(f'SUM({column})' for column in columns)}
+                FROM read_parquet('{files}', hive_partitioning = true)
+                WHERE {' AND '.join(filters)}
+                {group_by}
+                """,
+                params,
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+# Set by start_analytics() when the backend is enabled and DuckDB is installed
+analytics_store = None
+_refresher = None
+
+
+def start_analytics(sources):
+    """
+    Open the Parquet store and start exporting closed days of ``sources``
+    (ROLLUP_SOURCES) when the analytics backend is enabled.
+    """
+    global analytics_store, _refresher
+    config = get_analytics_config()
+    if not config["enabled"] or _refresher is not None:
+        return
+    if duckdb is None:
+        logger.error("ANALYTICS_ENABLED is set but duckdb is not installed; serving every range from MySQL.")
+        return
+    store = ParquetStore(config["path"])
+    store.load(sources)
+    analytics_store = store
+    _refresher = PeriodicTask("analytics-exporter", partial(store.export_pending, sources), config["export_interval"])
+    _refresher.start()
+
+
+def stop_analytics():
+    global analytics_store, _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+    analytics_store = None
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from app.config import get_query_budget_config
+from app.db import query_deadline
+
+
+class QueryBudgetMiddleware:
+    """
+    Gives the queries of every request the execution budget of its route
+    (QUERY_BUDGETS) and, when the client disconnects before the response is
+    complete, cancels the request so that run_db kills its queries in flight.
+    Paths under one of the ``excluded`` prefixes (long-lived streams) get
+    neither.
+    """
+
+    def __init__(self, app, excluded=()):
+        self.app = app
+        self.excluded = tuple(excluded)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded):
+            return await self.app(scope, receive, send)
+        config = get_query_budget_config()
+        budget = config["budgets"].get(scope["path"], config["default"]) if config["enabled"] else 0
+        token = query_deadline.set(time.monotonic() + budget if budget > 0 else None)
+        try:
+            if config["cancel_on_disconnect"]:
+                await self._cancel_on_disconnect(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            query_deadline.reset(token)
+
+    async def _cancel_on_disconnect(self, scope, receive, send):
+        # Every message is read here and passed on, so the app still gets the
+        # request body and, for streamed responses, the disconnect itself
+        messages = asyncio.Queue()
+        complete = False
+
+        async def listen():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def send_tracking(message):
+            nonlocal complete
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                complete = True
+
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send_tracking))
+        listener = asyncio.ensure_future(listen())
+        try:
+            await asyncio.wait({handler, listener}, return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done() and not complete:
+                # The client went away: nobody will read the response
+                handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            if not handler.cancelled():
+                handler.result()
+        finally:
+            listener.cancel()
+            handler.cancel()
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from functools import wraps
+import contextvars
+import threading
+import time
+
+from starlette.responses import Response
+
+from app.config import get_cache_config, get_single_flight_config
+from app.db import replica_reads
+from app.queries import params_bounds, parse_date, today
+from app.singleflight import single_flight
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "source", "start", "end")
+
+    def __init__(self, value, expires_at, source, start, end):
+        self.value = value
+        self.expires_at = expires_at
+        self.source = source
+        self.start = start
+        self.end = end
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of endpoint results.
+
+    Entries covering only past days never change and live until evicted;
+    entries whose range reaches today expire after a short TTL.
+    """
+
+    def __init__(self, max_entries=1024, open_ttl=30.0, closed_ttl=0.0):
+        self.max_entries = max_entries
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation; part of the ETag of cached responses
+        self.generation = 0
+
+    def get(self, key):
+        """
+        Return ``(True, value)`` on a hit and ``(False, None)`` on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires_at is None or entry.expires_at > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry.value
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, source, start, end):
+        ttl = self.closed_ttl if end <= today() else self.open_ttl
+        expires_at = time.monotonic() + ttl if ttl > 0 else None
+        with self._lock:
+            self._entries[key] = _Entry(value, expires_at, source, start, end)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, source=None, date=None):
+        """
+        Drop entries for ``source`` (entries over all sources always match)
+        whose range covers ``date``. With no arguments, drop everything.
+        """
+        day = parse_date(date) if date else None
+        with self._lock:
+            # Even with nothing cached here, clients may hold the old data
+            self.generation += 1
+            victims = [
+                key for key, entry in self._entries.items()
+                if (source is None or entry.source in (None, source))
+                and (day is None or entry.start <= day < entry.end)
+            ]
+            for key in victims:
+                del self._entries[key]
+        return len(victims)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "generation": self.generation,
+            }
+
+
+# Version of the data a request reads, set by the HTTP cache middleware. It is
+# part of the result cache key, so a body cached before new rows arrived is
+# never served under the ETag of the newer data.
+data_version = contextvars.ContextVar("data_version", default=None)
+
+result_cache = ResultCache(**{key: value for key, value in get_cache_config().items() if key != "enabled"})
+
+
+def _normalize_params(params):
+    # Handlers treat a missing source, "" and "all" alike, so share one entry
+    normalized = dict(params)
+    if normalized.get("source") in ("", "all"):
+        normalized["source"] = None
+    return normalized
+
+
+def cached(func):
+    """
+    Cache an async route handler's result keyed by endpoint and normalized query
+    parameters, and let concurrent identical requests share one computation.
+    Its queries may be served by a read replica fresh enough for the requested
+    range. Requests with malformed parameters bypass all three so the handler
+    reports the error as before.
+    """
+    @wraps(func)
+    async def wrapper(**params):
+        try:
+            normalized = _normalize_params(params)
+            start, end = params_bounds(normalized)
+        except ValueError:
+            return await func(**params)
+
+        caching = get_cache_config()["enabled"]
+        coalescing = get_single_flight_config()["enabled"]
+        key = (func.__name__, tuple(sorted(normalized.items())), data_version.get())
+        if caching:
+            hit, value = result_cache.get(key)
+            if hit:
+                return value
+
+        async def compute():
+            with replica_reads(end):
+                value = await func(**params)
+            if caching and not isinstance(value, Response):
+                # Streamed responses can only be consumed once
+                result_cache.set(key, value, normalized.get("source"), start, end)
+            return value
+
+        if not coalescing:
+            return await compute()
+        return await single_flight.do(key, compute, shareable=lambda value: not isinstance(value, Response))
+
+    return wrapper
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+
+from app.config import get_catalog_config, get_rollup_config
+from app.db import execute_query, run_db
+from app.periodic import PeriodicTask
+from app.services import get_table_info
+
+logger = logging.getLogger(__name__)
+
+
+class TableCatalog:
+    """
+    Every (source, tablename) ever seen in the extraction-info table, with
+    the time each table was first extracted.
+
+    The full history is scanned once; afterwards only rows past the
+    high-water mark (less the late-arrival grace) are read to pick up new
+    tables, so the summary endpoints never scan history per request.
+    """
+
+    def __init__(self):
+        self._tables = {}  # source -> {tablename: first_seen}
+        self._sorted = {}  # source or None -> sorted [(source, tablename)], dropped on change
+        self._mark = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._mark is not None
+
+    def _table(self):
+        table_info = get_table_info("db2")
+        return f"{table_info['database']}.{table_info['table']}"
+
+    def _merge(self, rows):
+        added = 0
+        with self._lock:
+            for source, tablename, first_seen, latest in rows:
+                tables = self._tables.setdefault(source, {})
+                if tablename not in tables:
+                    added += 1
+                    tables[tablename] = first_seen
+                elif first_seen < tables[tablename]:
+                    tables[tablename] = first_seen
+                if self._mark is None or latest > self._mark:
+                    self._mark = latest
+            if added:
+                self._sorted.clear()
+        return added
+
+    def refresh(self):
+        """
+        Load the catalog on first call, then add tables seen since the mark.
+        Returns the number of new tables.
+        """
+        with self._refresh_lock:
+            filters, params = "1=1", []
+            if self._mark is not None:
+                grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+                filters, params = "extractedtime >= %s", [self._mark - grace]
+            rows = execute_query(
+                f"""
+                SELECT source, tablename, MIN(extractedtime), MAX(extractedtime)
+                FROM {self._table()}
+                WHERE {filters}
+                GROUP BY source, tablename
+                """,
+                params,
+                "catalog.refresh",
+            )
+            added = self._merge(rows)
+            if self._mark is None:
+                # Empty table: later refreshes still only need new rows
+                with self._lock:
+                    self._mark = self._mark or datetime(1970, 1, 1)
+            return added
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await run_db(self.refresh)
+
+    def tables(self, source=None):
+        """
+        Sorted ``(source, tablename)`` pairs of ``source``, or of every
+        source for None/"all".
+        """
+        key = None if source in (None, "", "all") else source
+        with self._lock:
+            if key not in self._sorted:
+                sources = self._tables if key is None else {key: self._tables.get(key, {})}
+                self._sorted[key] = sorted(
+                    (name, tablename) for name, tables in sources.items() for tablename in tables
+                )
+            return self._sorted[key]
+
+    def unknown(self, pairs):
+        """
+        The ``(source, tablename)`` pairs not in the catalog yet.
+        """
+        with self._lock:
+            return [pair for pair in pairs if pair[1] not in self._tables.get(pair[0], ())]
+
+    def counts(self):
+        """
+        Number of known tables per source.
+        """
+        with self._lock:
+            return {source: len(tables) for source, tables in self._tables.items()}
+
+
+table_catalog = TableCatalog()
+_refresher = None
+
+
+def start_catalog():
+    """
+    Load the table catalog and start refreshing it.
+    """
+    global _refresher
+    if _refresher is not None:
+        return
+    try:
+        table_catalog.refresh()
+    except Exception as e:
+        # Loaded on first use instead
+        logger.error(f"Could not load table catalog: {str(e)}")
+    _refresher = PeriodicTask(
+        "catalog-refresher", table_catalog.refresh, get_catalog_config()["refresh_interval"], delay_first=True,
+    )
+    _refresher.start()
+
+
+def stop_catalog():
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
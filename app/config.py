@@ -36,3 +36,160 @@ def get_dynamic_table(api_key: str):
     except KeyError:
         raise ValueError(f"Invalid API key '{api_key}' in .env.")
 
+
+def get_pool_config():
+    """
+    Connection pool sizing and recycling settings, in seconds where applicable.
+    """
+    return {
+        "min_size": int(os.getenv("MYSQL_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("MYSQL_POOL_MAX_SIZE", 10)),
+        "checkout_timeout": float(os.getenv("MYSQL_POOL_CHECKOUT_TIMEOUT", 10)),
+        "idle_timeout": float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", 300)),
+        "max_lifetime": float(os.getenv("MYSQL_POOL_MAX_LIFETIME", 1800)),
+        "health_check_after": float(os.getenv("MYSQL_POOL_HEALTH_CHECK_AFTER", 5)),
+        "reap_interval": float(os.getenv("MYSQL_POOL_REAP_INTERVAL", 30)),
+        # Prepared statements cached per connection (0 disables)
+        "statement_cache_size": int(os.getenv("MYSQL_STATEMENT_CACHE_SIZE", 100)),
+    }
+
+def get_replica_config():
+    """
+    Read replicas for read-only request queries, as comma-separated
+    ``host[:port]`` endpoints sharing the primary's credentials, and the lag
+    (in seconds) beyond which a replica no longer serves ranges reaching the
+    present.
+    """
+    replicas = []
+    for endpoint in os.getenv("MYSQL_REPLICAS", "").split(","):
+        host, _, port = endpoint.strip().partition(":")
+        if host:
+            replicas.append({**get_mysql_config(), "host": host, "port": int(port or 3306)})
+    return {
+        "replicas": replicas,
+        "max_lag": float(os.getenv("MYSQL_REPLICA_MAX_LAG", 30)),
+        "lag_check_interval": float(os.getenv("MYSQL_REPLICA_LAG_CHECK_INTERVAL", 5)),
+    }
+
+def get_query_budget_config():
+    """
+    Whether requests get a query execution budget, the budget in seconds of
+    every request (0 for none) with per-route overrides keyed by path
+    (QUERY_BUDGETS, e.g. ``/api/timeseries=60,/api/tables_summary_date_range=120``),
+    and whether a client disconnect cancels the request and kills its queries.
+    """
+    budgets = {}
+    for entry in os.getenv("QUERY_BUDGETS", "").split(","):
+        path, _, seconds = entry.strip().partition("=")
+        if path:
+            budgets[path] = float(seconds)
+    return {
+        "enabled": os.getenv("QUERY_BUDGET_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "default": float(os.getenv("QUERY_BUDGET_DEFAULT", 30)),
+        "budgets": budgets,
+        "cancel_on_disconnect": os.getenv("QUERY_CANCEL_ON_DISCONNECT", "true").lower() in ("1", "true", "yes"),
+    }
+
+def get_admission_config():
+    """
+    Concurrency limits of the data endpoints by cost class: requests reading
+    more than ``heavy_span_days`` or on one of ``heavy_routes`` are "heavy",
+    the rest "cheap". Each class runs at most ``<class>_limit`` requests at
+    once and queues at most ``<class>_queue`` more, for up to
+    ``queue_timeout`` seconds, before answering 429.
+    """
+    return {
+        "enabled": os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "heavy_span_days": float(os.getenv("ADMISSION_HEAVY_SPAN_DAYS", 14)),
+        "heavy_routes": [route.strip() for route in os.getenv("ADMISSION_HEAVY_ROUTES", "").split(",") if route.strip()],
+        "cheap_limit": int(os.getenv("ADMISSION_CHEAP_LIMIT", 32)),
+        "cheap_queue": int(os.getenv("ADMISSION_CHEAP_QUEUE", 64)),
+        "heavy_limit": int(os.getenv("ADMISSION_HEAVY_LIMIT", 4)),
+        "heavy_queue": int(os.getenv("ADMISSION_HEAVY_QUEUE", 8)),
+        "queue_timeout": float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10)),
+    }
+
+def get_rollup_config():
+    """
+    Settings for the pre-aggregated hourly/daily rollup tables.
+    """
+    return {
+        "enabled": os.getenv("ROLLUPS_ENABLED", "false").lower() in ("1", "true", "yes"),
+        "database": os.getenv("ROLLUP_DATABASE", os.getenv("EXTRACTION_INFO_DATABASE")),
+        "refresh_interval": float(os.getenv("ROLLUP_REFRESH_INTERVAL", 60)),
+        "late_arrival_grace": float(os.getenv("ROLLUP_LATE_ARRIVAL_GRACE", 3600)),
+    }
+
+def get_analytics_config():
+    """
+    Settings for the optional DuckDB/Parquet backend serving closed days.
+    """
+    return {
+        "enabled": os.getenv("ANALYTICS_ENABLED", "false").lower() in ("1", "true", "yes"),
+        "path": os.getenv("ANALYTICS_PATH", "analytics_data"),
+        "export_interval": float(os.getenv("ANALYTICS_EXPORT_INTERVAL", 3600)),
+    }
+
+def get_cache_config():
+    """
+    Settings for the in-process endpoint result cache. A closed TTL of 0
+    keeps results for fully past ranges until they are evicted or invalidated.
+    """
+    return {
+        "enabled": os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "max_entries": int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1024)),
+        "open_ttl": float(os.getenv("RESULT_CACHE_OPEN_TTL", 30)),
+        "closed_ttl": float(os.getenv("RESULT_CACHE_CLOSED_TTL", 0)),
+    }
+
+def get_single_flight_config():
+    """
+    Whether concurrent identical requests share one in-flight computation.
+    """
+    return {
+        "enabled": os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes"),
+    }
+
+def get_query_timing_config():
+    """
+    Queries slower than ``slow_threshold`` seconds are logged with their
+    EXPLAIN plan (when ``explain`` is on); ``server_timing`` adds the
+    Server-Timing header to responses.
+    """
+    return {
+        "slow_threshold": float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500)) / 1000,
+        "explain": os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes"),
+        "server_timing": os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes"),
+    }
+
+def get_http_cache_config():
+    """
+    Settings for ETag/Cache-Control headers and response compression.
+    """
+    return {
+        "enabled": os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "closed_max_age": int(os.getenv("HTTP_CACHE_CLOSED_MAX_AGE", 86400)),
+        "gzip_minimum_size": int(os.getenv("GZIP_MINIMUM_SIZE", 1024)),
+    }
+
+def get_event_stream_config():
+    """
+    Settings for the live extraction event stream: how often the shared
+    poller tails the extraction-info table, how many rows it reads per poll,
+    how many events a slow client may lag behind before it is disconnected,
+    and the keep-alive interval for idle connections.
+    """
+    return {
+        "poll_interval": float(os.getenv("EVENT_STREAM_POLL_INTERVAL", 2)),
+        "batch_size": int(os.getenv("EVENT_STREAM_BATCH_SIZE", 1000)),
+        "max_queue": int(os.getenv("EVENT_STREAM_MAX_QUEUE", 1000)),
+        "heartbeat": float(os.getenv("EVENT_STREAM_HEARTBEAT", 15)),
+    }
+
+def get_catalog_config():
+    """
+    Settings for the in-memory catalog of known tables per source.
+    """
+    return {
+        "refresh_interval": float(os.getenv("CATALOG_REFRESH_INTERVAL", 30)),
+    }
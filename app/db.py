@@ -1,21 +1,1004 @@
-from app.config import get_mysql_config
+from app.config import (
+    get_mysql_config, get_pool_config, get_query_timing_config, get_replica_config, get_rollup_config,
+)
+from app.metrics import observe_query, query_label
+from app.periodic import PeriodicTask
+from app.timing import request_timing
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+import asyncio
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
 import pymysql
 
-def execute_query(query: str):
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection becomes available within the checkout timeout.
+    """
+
+
+class QueryTimeout(pymysql.err.OperationalError):
+    """
+    Raised when a query is stopped for exceeding the execution budget of the
+    request it runs for. An OperationalError so the pool discards the
+    connection, which may have been cut mid-result.
+    """
+
+
+class _PooledConnection:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PreparedStatements:
+    """
+    Server-side prepared statements of one connection by SQL template, least
+    recently used first, and the session time limit last set for them.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.time_limit = None  # seconds; None when unlimited
+        self._names = OrderedDict()  # template -> statement name, None if it cannot be prepared
+        self._next = 0
+
+    def get(self, query):
+        """
+        ``(found, name)`` of the statement prepared for ``query``.
+        """
+        name = self._names.get(query, _MISSING)
+        if name is _MISSING:
+            return False, None
+        self._names.move_to_end(query)
+        return True, name
+
+    def new_name(self):
+        self._next += 1
+        return f"stmt_{self._next}"
+
+    def add(self, query, name):
+        """
+        Remember ``name`` for ``query``; returns the name of the evicted least
+        recently used statement, if any, to deallocate.
+        """
+        self._names[query] = name
+        if len(self._names) > self.max_size:
+            return self._names.popitem(last=False)[1]
+        return None
+
+
+_MISSING = object()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PyMySQL connections.
+
+    Connections are health-checked on checkout when they have been idle for a
+    while, recycled once they exceed ``max_lifetime`` and evicted by a reaper
+    thread when idle for longer than ``idle_timeout`` (never below ``min_size``).
     """
-    Executes a given SQL query using MySQL connection.
+
+    def __init__(self, mysql_config, min_size=2, max_size=10, checkout_timeout=10.0,
+                 idle_timeout=300.0, max_lifetime=1800.0, health_check_after=5.0,
+                 reap_interval=30.0, statement_cache_size=100):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1.")
+        self.mysql_config = mysql_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.reap_interval = reap_interval
+        self.statement_cache_size = statement_cache_size
+
+        self._idle = []  # LIFO stack of _PooledConnection, most recently used last
+        self._size = 0  # open connections, idle + in use
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reaper = None
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "recycled": 0,
+            "evicted_idle": 0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(
+            host=self.mysql_config["host"],
+            port=self.mysql_config["port"],
+            user=self.mysql_config["user"],
+            password=self.mysql_config["password"],
+            # Pooled connections are reused across requests, so each statement
+            # must see committed data instead of a long-lived snapshot.
+            autocommit=True,
+        )
+        # Prepared statements live as long as the server session
+        raw.statements = PreparedStatements(self.statement_cache_size)
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(raw)
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+
+    def _is_expired(self, conn, now):
+        return self.max_lifetime and now - conn.created_at >= self.max_lifetime
+
+    def start(self):
+        """
+        Start the idle reaper and open ``min_size`` connections.
+        """
+        if self.reap_interval > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name="mysql-pool-reaper", daemon=True)
+            self._reaper.start()
+        for _ in range(self.min_size):
+            with self._cond:
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(conn)
+
+    def acquire(self):
+        """
+        Check out a healthy connection, opening a new one if the pool has room.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = None
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed.")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    if waited is None:
+                        waited = time.monotonic()
+                        self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.checkout_timeout}s waiting for a MySQL connection."
+                        )
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._is_expired(conn, now):
+                    self._count("recycled")
+                    self._discard(conn)
+                    continue
+                if now - conn.last_used >= self.health_check_after:
+                    try:
+                        conn.raw.ping(reconnect=False)
+                    except Exception:
+                        self._count("health_check_failures")
+                        self._discard(conn)
+                        continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited is not None:
+                    wait_time = time.monotonic() - waited
+                    self._stats["wait_time_total"] += wait_time
+                    self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+            return conn
+
+    def release(self, conn, broken=False):
+        """
+        Return a connection to the pool, closing it if broken or past its lifetime.
+        """
+        now = time.monotonic()
+        if self._is_expired(conn, now):
+            self._count("recycled")
+            broken = True
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        conn.last_used = now
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager yielding a raw PyMySQL connection from the pool.
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn.raw
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def _reap_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, timeout=self.reap_interval)
+                if self._closed:
+                    return
+            self.reap()
+
+    def reap(self):
+        """
+        Close connections that have been idle too long or outlived ``max_lifetime``.
+        """
+        now = time.monotonic()
+        victims = []
+        with self._cond:
+            keep = []
+            # Oldest idle connections sit at the bottom of the stack.
+            for conn in self._idle:
+                expired = self._is_expired(conn, now)
+                idle_too_long = (
+                    self.idle_timeout
+                    and now - conn.last_used >= self.idle_timeout
+                    and self._size - len(victims) > self.min_size
+                )
+                if expired or idle_too_long:
+                    victims.append(conn)
+                    self._stats["recycled" if expired else "evicted_idle"] += 1
+                else:
+                    keep.append(conn)
+            self._idle = keep
+        for conn in victims:
+            self._discard(conn)
+
+    def stats(self):
+        """
+        Snapshot of pool utilization and wait metrics.
+        """
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+    def load(self):
+        """
+        Fraction of ``max_size`` currently checked out.
+        """
+        with self._cond:
+            return (self._size - len(self._idle)) / self.max_size
+
+    def close(self):
+        """
+        Close every idle connection; in-use ones are closed when released.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+
+class Replica:
     """
-    mysql_config = get_mysql_config()
-    connection = pymysql.connect(
-        host=mysql_config["host"],
-        port=mysql_config["port"],
-        user=mysql_config["user"],
-        password=mysql_config["password"]
+    A read replica: its connection pool and its replication lag as last
+    measured by check_replicas.
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.name = f"{pool.mysql_config['host']}:{pool.mysql_config['port']}"
+        self.lag = None  # seconds behind the primary; None when unknown or not replicating
+        self.checked_at = None  # time.monotonic() of the last measurement
+
+    def measure_lag(self):
+        """
+        Read ``Seconds_Behind_Source`` (MySQL) or ``Seconds_Behind_Master``
+        (MariaDB, older MySQL); None when replication is stopped.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except pymysql.err.ProgrammingError:
+                    # Before MySQL 8.0.22 / MariaDB 10.5.1
+                    cursor.execute("SHOW SLAVE STATUS")
+                columns = [column[0] for column in cursor.description]
+                row = cursor.fetchone()
+        if row is None:
+            return None  # not configured as a replica
+        status = dict(zip(columns, row))
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+
+    def current_lag(self):
+        """
+        Measured lag plus the time since it was measured, the worst case if
+        replication stalled right after the check.
+        """
+        lag, checked_at = self.lag, self.checked_at
+        if lag is None or checked_at is None:
+            return None
+        return lag + (time.monotonic() - checked_at)
+
+    def stats(self):
+        return {"name": self.name, "lag": self.lag, **self.pool.stats()}
+
+
+def check_replicas(replicas):
+    """
+    Measure the lag of every replica; a replica that cannot be measured is
+    not read from until it can.
+    """
+    for replica in replicas:
+        try:
+            lag = replica.measure_lag()
+        except Exception as e:
+            logger.warning(f"Could not measure lag of replica {replica.name}: {str(e)}")
+            lag = None
+        replica.lag, replica.checked_at = lag, time.monotonic()
+
+
+_pool = None
+_replicas = []
+_replica_monitor = None
+_replica_fallbacks = 0
+_pool_lock = threading.Lock()
+
+
+def _start_pool(pool, name):
+    try:
+        pool.start()
+    except Exception as e:
+        # Keep serving; connections are opened lazily on first checkout.
+        logger.error(f"Could not pre-fill MySQL connection pool of {name}: {str(e)}")
+
+
+def init_pool():
+    """
+    Create the process-wide connection pools, for the primary and for every
+    read replica, and start measuring replica lag. Called once at app startup.
+    """
+    global _pool, _replicas, _replica_monitor
+    with _pool_lock:
+        if _pool is None:
+            pool_config = get_pool_config()
+            replica_config = get_replica_config()
+            pool = ConnectionPool(get_mysql_config(), **pool_config)
+            _start_pool(pool, "the primary")
+            replicas = [Replica(ConnectionPool(endpoint, **pool_config)) for endpoint in replica_config["replicas"]]
+            for replica in replicas:
+                _start_pool(replica.pool, f"replica {replica.name}")
+            if replicas:
+                check_replicas(replicas)
+                _replica_monitor = PeriodicTask(
+                    "replica-monitor", partial(check_replicas, replicas), replica_config["lag_check_interval"],
+                    delay_first=True,
+                )
+                _replica_monitor.start()
+            _pool, _replicas = pool, replicas
+    return _pool
+
+
+def close_pool():
+    """
+    Close the process-wide connection pools. Called at app shutdown.
+    """
+    global _pool, _replicas, _replica_monitor, _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        if _replica_monitor is not None:
+            _replica_monitor.stop()
+            _replica_monitor = None
+        for replica in _replicas:
+            replica.pool.close()
+        _replicas = []
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool():
+    """
+    Return the shared primary pool, creating it on first use outside the app
+    lifecycle.
+    """
+    return _pool or init_pool()
+
+
+class _ReadRoute:
+    """
+    Where the reads of one request go: chosen on its first query and kept
+    for the rest, so that its data version and body come from the same
+    server and the body is never older than the version it is cached under.
+    """
+
+    __slots__ = ("end", "pool", "lock")
+
+    def __init__(self, end):
+        self.end = end
+        self.pool = None
+        self.lock = threading.Lock()
+
+
+# Read route of the current request, set (see replica_reads) for read-only
+# work that a replica may serve; None routes every query to the primary.
+read_route = contextvars.ContextVar("read_route", default=None)
+
+
+@contextmanager
+def replica_reads(end: datetime = None):
+    """
+    Let the queries run in this context go to a read replica. ``end`` is the
+    exclusive end of the range they read; None means up to the present. A
+    nested call keeps the route of the enclosing one.
+    """
+    if read_route.get() is not None:
+        yield
+        return
+    token = read_route.set(_ReadRoute(end or datetime.max))
+    try:
+        yield
+    finally:
+        read_route.reset(token)
+
+
+def _choose_pool(end):
+    global _replica_fallbacks
+    pool = get_pool()
+    if not _replicas:
+        return pool
+    closed_for = 0.0
+    if end != datetime.max:
+        grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+        closed_for = (datetime.now() - end - grace).total_seconds()
+    allowed = max(get_replica_config()["max_lag"], closed_for)
+    fresh = [(replica.pool.load(), lag, replica) for replica in _replicas
+             if (lag := replica.current_lag()) is not None and lag <= allowed]
+    if not fresh:
+        _replica_fallbacks += 1
+        return pool
+    return min(fresh, key=lambda candidate: candidate[:2])[2].pool
+
+
+def read_pool():
+    """
+    Pool for a read in the current context: the least loaded replica that is
+    fresh enough for the range being read, else the primary.
+
+    A replica lagging ``lag`` seconds has every row written until ``lag``
+    seconds ago. Ranges reaching the present accept up to MYSQL_REPLICA_MAX_LAG
+    of staleness; a range that closed (with its late-arrival grace) longer
+    ago than the lag is complete on the replica whatever the threshold.
+    """
+    route = read_route.get()
+    if route is None:
+        return get_pool()
+    with route.lock:
+        if route.pool is None:
+            route.pool = _choose_pool(route.end)
+        return route.pool
+
+
+def replica_stats():
+    """
+    Per-replica lag and pool utilization, and how many replica-eligible
+    requests went to the primary because no replica was fresh enough.
+    """
+    return {
+        "replicas": [replica.stats() for replica in _replicas],
+        "fallbacks_to_primary": _replica_fallbacks,
+    }
+
+
+# Optional one-item list counting the queries run in the current context,
+# e.g. by the single-flight leader of a request.
+query_count = contextvars.ContextVar("query_count", default=None)
+
+
+def _count_query():
+    counter = query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# Slow queries are logged here, to be routed separately from the app log
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+_EXPLAINABLE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def _log_if_slow(connection, query, params, name, elapsed, rows):
+    """
+    Log a query slower than the threshold with its normalized text,
+    parameters, row count and EXPLAIN plan, captured on the connection that
+    ran it.
+    """
+    config = get_query_timing_config()
+    if elapsed < config["slow_threshold"]:
+        return
+    plan = None
+    if config["explain"] and _EXPLAINABLE.match(query):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {query}", params)
+                columns = [column[0] for column in cursor.description]
+                plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            plan = f"unavailable: {str(e)}"
+    slow_query_logger.warning(
+        f"Slow query {name or query_label.get()}: {elapsed * 1000:.0f} ms, {rows} rows; "
+        f"sql={' '.join(query.split())} params={params!r} plan={json.dumps(plan, default=str)}"
     )
+
+
+# time.monotonic() deadline for the queries of the request being served, set
+# from its route's budget by QueryBudgetMiddleware; None means no limit.
+query_deadline = contextvars.ContextVar("query_deadline", default=None)
+
+# Server-side "maximum execution time exceeded" errors of MySQL and MariaDB,
+# and the client-side lost-connection error of a read timeout
+_TIME_LIMIT_ERRORS = (3024, 1969)
+_READ_TIMEOUT_ERROR = 2013
+
+_SELECT = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
+
+def _with_time_limit(connection, query, seconds):
+    """
+    Bound the server-side execution time of ``query``: MariaDB takes a
+    statement-level max_statement_time, MySQL an optimizer hint on SELECT.
+    """
+    if "MariaDB" in connection.get_server_info():
+        return f"SET STATEMENT max_statement_time={seconds:.3f} FOR {query}"
+    match = _SELECT.match(query)
+    if match is None:
+        return query
+    return f"{match.group(0)} /*+ MAX_EXECUTION_TIME({max(int(seconds * 1000), 1)}) */{query[match.end():]}"
+
+
+def _kill_query(mysql_config, thread_id):
+    # On a connection of its own: the pool may be exhausted by exactly the
+    # queries that need killing
     try:
+        connection = pymysql.connect(
+            host=mysql_config["host"],
+            port=mysql_config["port"],
+            user=mysql_config["user"],
+            password=mysql_config["password"],
+            connect_timeout=5,
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"KILL QUERY {int(thread_id)}")
+        finally:
+            connection.close()
+    except Exception as e:
+        logger.warning(f"Could not kill query of connection {thread_id}: {str(e)}")
+
+
+class _InFlight:
+    """
+    The query a run_db call is running, so that it can be killed from another
+    thread once nobody awaits its result.
+    """
+
+    __slots__ = ("lock", "target", "cancelled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.target = None  # (mysql_config, connection thread id)
+        self.cancelled = False
+
+    def kill(self):
+        # Holding the lock keeps the connection from being reused for another
+        # query until the KILL has gone through
+        with self.lock:
+            self.cancelled = True
+            if self.target is not None:
+                _kill_query(*self.target)
+
+
+_in_flight = contextvars.ContextVar("in_flight", default=None)
+
+
+@contextmanager
+def _guarded(pool, connection):
+    """
+    Run a query within the execution budget of the current request and
+    killable by run_db. Yields the seconds left of the budget, or None.
+    """
+    deadline = query_deadline.get()
+    remaining = None
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueryTimeout("Query budget of the request exhausted.")
+        # Backstop for statements without a server-side limit; PyMySQL applies
+        # it to every socket read
+        connection._read_timeout = remaining + 1
+    target = (pool.mysql_config, connection.thread_id())
+    in_flight = _in_flight.get()
+    if in_flight is not None:
+        with in_flight.lock:
+            if in_flight.cancelled:
+                raise QueryTimeout("Query cancelled before it started.")
+            in_flight.target = target
+    try:
+        yield remaining
+    except pymysql.err.OperationalError as e:
+        code = e.args[0] if e.args else None
+        if deadline is None or not (
+            code in _TIME_LIMIT_ERRORS or (code == _READ_TIMEOUT_ERROR and time.monotonic() >= deadline)
+        ):
+            raise
+        if code == _READ_TIMEOUT_ERROR:
+            # Only the client gave up; stop the server working on it
+            _kill_query(*target)
+        raise QueryTimeout("Query exceeded the execution budget of the request.") from e
+    finally:
+        if in_flight is not None:
+            with in_flight.lock:
+                in_flight.target = None
+        if deadline is not None:
+            connection._read_timeout = None
+
+
+# Statement errors after which a template is run unprepared: not preparable
+# (remembered for the connection), and the server's max_prepared_stmt_count
+# reached (retried on the next use)
+_UNSUPPORTED_PS = 1295
+_TOO_MANY_PREPARED = 1461
+
+# Never equal to a budget, so the next statement sets the limit again
+_UNKNOWN_TIME_LIMIT = -1.0
+
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+_statement_stats = {"hits": 0, "misses": 0, "evictions": 0, "unprepared": 0}
+_statement_stats_lock = threading.Lock()
+
+
+def _count_statement(key):
+    with _statement_stats_lock:
+        _statement_stats[key] += 1
+
+
+def statement_cache_stats():
+    """
+    Prepared-statement cache hits and misses across every pooled connection.
+    """
+    with _statement_stats_lock:
+        stats = dict(_statement_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _time_limit_assignment(connection, seconds):
+    if "MariaDB" in connection.get_server_info():
+        return f"SESSION max_statement_time = {seconds or 0:.3f}"
+    return f"SESSION max_execution_time = {max(int(seconds * 1000), 1) if seconds else 0}"
+
+
+def _reset_time_limit(connection):
+    """
+    Clear the session time limit left by a budgeted prepared statement
+    before running anything else on the connection.
+    """
+    statements = connection.statements
+    if statements.time_limit is not None:
         with connection.cursor() as cursor:
-            cursor.execute(query)
-            return cursor.fetchall()
+            cursor.execute(f"SET {_time_limit_assignment(connection, None)}")
+        statements.time_limit = None
+
+
+def _preparable(params):
+    # Only positional scalars map onto "?" placeholders one to one
+    if params is None:
+        return True
+    return isinstance(params, (list, tuple)) and not any(isinstance(p, (list, tuple, set, dict)) for p in params)
+
+
+def _execute_prepared(connection, cursor, query, params, time_limit):
+    """
+    Run ``query`` as a server-side prepared statement of ``connection``,
+    preparing it on first use. ``%s`` placeholders become ``?`` bound to user
+    variables, set in one statement together with the session time limit; the
+    budget cannot go into the statement text without defeating reuse. Returns
+    None when the template cannot be prepared.
+    """
+    statements = connection.statements
+    found, name = statements.get(query)
+    if found and name is None:
+        _count_statement("unprepared")
+        return None
+    if not found:
+        name = statements.new_name()
+        template = query if params is None else _PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", query)
+        try:
+            cursor.execute(f"PREPARE {name} FROM %s", [template])
+        except pymysql.err.OperationalError as e:
+            code = e.args[0] if e.args else None
+            if code not in (_UNSUPPORTED_PS, _TOO_MANY_PREPARED):
+                raise
+            if code == _UNSUPPORTED_PS:
+                statements.add(query, None)
+            _count_statement("unprepared")
+            return None
+
+    params = list(params or ())
+    assignments = [f"@p{index} = %s" for index in range(len(params))]
+    if time_limit != statements.time_limit:
+        assignments.append(_time_limit_assignment(connection, time_limit))
+    using = f" USING {', '.join(f'@p{index}' for index in range(len(params)))}" if params else ""
+    try:
+        if assignments:
+            cursor.execute(f"SET {', '.join(assignments)}", params)
+        cursor.execute(f"EXECUTE {name}{using}")
+        rows = cursor.fetchall()
+    except pymysql.err.MySQLError:
+        # Whether the SET ran is unknown: have the limit set again next time
+        statements.time_limit = _UNKNOWN_TIME_LIMIT
+        if not found:
+            try:
+                cursor.execute(f"DEALLOCATE PREPARE {name}")
+            except pymysql.err.MySQLError:
+                pass
+        raise
+    statements.time_limit = time_limit
+
+    if found:
+        _count_statement("hits")
+    else:
+        _count_statement("misses")
+        evicted = statements.add(query, name)
+        if evicted is not None:
+            _count_statement("evictions")
+            cursor.execute(f"DEALLOCATE PREPARE {evicted}")
+    return rows
+
+
+def execute_query(query: str, params=None, name=None):
+    """
+    Executes a given SQL query on a pooled MySQL connection. ``name`` labels
+    its metrics and slow-query log entries (default: the route being served).
+    The query is limited to what is left of the request's execution budget
+    and runs as a prepared statement cached on the connection when it can.
+    """
+    _count_query()
+    pool = read_pool()
+    with pool.connection() as connection:
+        started = time.perf_counter()
+        rows = None
+        try:
+            with _guarded(pool, connection) as time_limit, connection.cursor() as cursor:
+                if connection.statements.max_size > 0 and _preparable(params):
+                    rows = _execute_prepared(connection, cursor, query, params, time_limit)
+                if rows is None:
+                    _reset_time_limit(connection)
+                    cursor.execute(query if time_limit is None else _with_time_limit(connection, query, time_limit), params)
+                    rows = cursor.fetchall()
+        finally:
+            observe_query(name, started, None if rows is None else len(rows))
+        _log_if_slow(connection, query, params, name, time.perf_counter() - started, len(rows))
+        return rows
+
+
+def execute_transaction(statements):
+    """
+    Executes ``(sql, params)`` statements atomically on one pooled connection.
+    """
+    with get_pool().connection() as connection:
+        _reset_time_limit(connection)
+        connection.begin()
+        try:
+            with connection.cursor() as cursor:
+                for query, params in statements:
+                    cursor.execute(query, params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+
+def stream_query(query: str, params=None, chunk_size: int = 1000, name=None):
+    """
+    Yields the rows of a query in lists of up to ``chunk_size`` from an
+    unbuffered server-side cursor, so the full result is never held in memory.
+    The query is limited to what is left of the request's execution budget
+    until its last row is read.
+
+    The pooled connection stays checked out until the rows are exhausted. If
+    the consumer stops early the connection is discarded rather than drained.
+    """
+    _count_query()
+    pool = read_pool()
+    conn = pool.acquire()
+    exhausted = False
+    started, count = time.perf_counter(), 0
+    try:
+        with _guarded(pool, conn.raw) as time_limit:
+            _reset_time_limit(conn.raw)
+            cursor = conn.raw.cursor(pymysql.cursors.SSCursor)
+            cursor.execute(query if time_limit is None else _with_time_limit(conn.raw, query, time_limit), params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                count += len(rows)
+                yield rows
+            cursor.close()
+        exhausted = True
+        observe_query(name, started, count)
+        # Includes the time the consumer took between chunks
+        _log_if_slow(conn.raw, query, params, name, time.perf_counter() - started, count)
+    except Exception:
+        observe_query(name, started)
+        raise
     finally:
-        connection.close()
+        pool.release(conn, broken=not exhausted)
+
 
+def stream(query: str, params=None, chunk_size: int = 1000, name=None):
+    """
+    Async counterpart of ``stream_query`` for streamed responses, which are
+    read after the handler has returned. The context of the call (replica
+    route, execution budget) is kept for every chunk, each read on the DB
+    executor. When the consumer is cancelled (its client disconnected) or
+    stops early, the query is killed.
+    """
+    context = contextvars.copy_context()
+    in_flight = _InFlight()
+    context.run(_in_flight.set, in_flight)
+    # Choose the pool now, while the handler's replica route is current
+    context.run(read_pool)
+    chunks = context.run(stream_query, query, params, chunk_size, name)
+
+    # Held while a chunk is read, so the chunks are closed between reads
+    lock = threading.Lock()
+
+    def next_chunk():
+        with lock:
+            return context.run(next, chunks, None)
+
+    def stop():
+        # The KILL ends a read in progress, which then releases the lock
+        in_flight.kill()
+        with lock:
+            context.run(chunks.close)
+
+    async def read():
+        loop = asyncio.get_running_loop()
+        exhausted = False
+        try:
+            while True:
+                rows = await loop.run_in_executor(get_executor(), next_chunk)
+                if rows is None:
+                    exhausted = True
+                    return
+                yield rows
+        finally:
+            if not exhausted:
+                threading.Thread(target=stop, name="mysql-kill", daemon=True).start()
+
+    return read()
+
+
+# Blocking PyMySQL calls made on behalf of async handlers run on this
+# executor. It has one thread per pooled connection, so awaiting requests
+# queue on the event loop instead of occupying Starlette's worker threads.
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Enough threads to keep every pool busy
+        max_workers = get_pool().max_size + sum(replica.pool.max_size for replica in _replicas)
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mysql-query")
+    return _executor
+
+
+async def run_db(func, *args):
+    """
+    Await a blocking DB call on the DB executor, keeping the caller's context.
+    If the caller is cancelled (e.g. its client disconnected) the query in
+    flight is killed rather than left holding a connection and a thread.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = _InFlight()
+    context = contextvars.copy_context()
+    context.run(_in_flight.set, in_flight)
+    call = partial(context.run, func, *args)
+    timing = request_timing.get()
+    if timing is not None:
+        # DB time of the request for the Server-Timing header
+        timing.db_started()
+    try:
+        return await loop.run_in_executor(get_executor(), call)
+    except asyncio.CancelledError:
+        threading.Thread(target=in_flight.kill, name="mysql-kill", daemon=True).start()
+        raise
+    finally:
+        if timing is not None:
+            timing.db_finished()
+
+
+async def fetch(query: str, params=None, name=None):
+    """
+    Async counterpart of ``execute_query``.
+    """
+    return await run_db(execute_query, query, params, name)
+
+
+async def fetch_many(*queries):
+    """
+    Runs independent queries concurrently on separate pooled connections and
+    returns their results in the same order. Each query is either a SQL string
+    or a ``(sql, params)`` / ``(sql, params, name)`` tuple.
+    """
+    queries = [query if isinstance(query, tuple) else (query, None) for query in queries]
+    return list(await asyncio.gather(*(fetch(*query) for query in queries)))
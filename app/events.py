@@ -0,0 +1,168 @@
+from datetime import datetime
+import asyncio
+import contextvars
+import json
+import logging
+
+from app.config import get_event_stream_config
+from app.db import fetch
+from app.queries import Filter
+from app.services import get_table_info
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    __slots__ = ("source", "queue")
+
+    def __init__(self, source):
+        self.source = source
+        self.queue = asyncio.Queue()
+
+
+class ExtractionTail:
+    """
+    One poller per process tailing the extraction-info table for new rows
+    and fanning them out, already encoded as SSE messages, to every
+    subscriber whose source matches.
+
+    Rows are read past an extractedtime high-water mark that only moves over
+    whole seconds, and never into the current one, so rows committed in the
+    same second as a poll are still read by the next. Rows written later
+    with an older extractedtime are not replayed. The poller only runs while
+    someone is subscribed and starts at the newest row.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._mark = None
+        self._task = None
+
+    def subscribe(self, source=None):
+        subscriber = _Subscriber(None if source in (None, "", "all") else source)
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            # Shared by every subscriber, so it must not inherit the first
+            # one's request context (query budget, timing, metric labels)
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    def stop(self):
+        """
+        Stop polling and end every open stream.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscriber in self._subscribers:
+            subscriber.queue.put_nowait(None)
+        self._subscribers.clear()
+
+    async def _run(self):
+        config = get_event_stream_config()
+        while self._subscribers:
+            try:
+                count = await self.poll(config["batch_size"])
+            except Exception as e:
+                logger.error(f"Error polling extraction events: {str(e)}")
+                count = 0
+            # Keep reading without pausing while a backlog is being drained
+            if count < config["batch_size"]:
+                await asyncio.sleep(config["poll_interval"])
+        self._mark = None
+
+    async def poll(self, batch_size: int = 1000) -> int:
+        """
+        Publish the rows added since the last poll; returns how many were read.
+        """
+        table_info = get_table_info("db2")
+        table = f"{table_info['database']}.{table_info['table']}"
+
+        if self._mark is None:
+            rows = await fetch(
+                f"SELECT MAX(extractedtime) FROM {table} WHERE extractedtime < NOW()", name="extraction_tail.mark",
+            )
+            self._mark = rows[0][0] or datetime(1970, 1, 1)
+            return 0
+
+        # Only the sources someone listens to (all of them if anyone wants all)
+        sources = {subscriber.source for subscriber in self._subscribers}
+        filters = Filter().sources([] if None in sources else sorted(sources))
+        # Rows of the current second may still be committed after this poll
+        filters.add("extractedtime > %s AND extractedtime < NOW()", self._mark)
+        query = f"""
+            SELECT source, tablename, extractedtime, status, status_message
+            FROM {table}
+            WHERE {filters.sql}
+            ORDER BY extractedtime, source, tablename
+            LIMIT %s
+        """
+        rows = await fetch(query, filters.params + [batch_size], "extraction_tail.poll")
+        read = len(rows)
+        if read == batch_size:
+            # The last second may continue past the batch: leave it for the
+            # next poll, or read it whole when it fills the batch by itself
+            last = rows[-1][2]
+            rows = [row for row in rows if row[2] < last]
+            if not rows:
+                second = Filter().sources([] if None in sources else sorted(sources)).add("extractedtime = %s", last)
+                rows = await fetch(f"""
+                    SELECT source, tablename, extractedtime, status, status_message
+                    FROM {table}
+                    WHERE {second.sql}
+                    ORDER BY source, tablename
+                """, second.params, "extraction_tail.poll_second")
+        if rows:
+            self._mark = rows[-1][2]
+            self._publish(rows)
+        return read
+
+    def _publish(self, rows):
+        max_queue = get_event_stream_config()["max_queue"]
+        for source, tablename, extracted_at, status, status_message in rows:
+            event = {
+                "date": extracted_at.strftime('%Y-%m-%d'),
+                "time": extracted_at.strftime('%H:%M:%S'),
+                "source": source,
+                "tablename": tablename,
+                "status": status,
+                "status_message": status_message,
+            }
+            # Encoded once, whatever the number of listeners
+            message = f"event: extraction\ndata: {json.dumps(event, default=str)}\n\n"
+            for subscriber in list(self._subscribers):
+                if subscriber.source is not None and subscriber.source != source:
+                    continue
+                if subscriber.queue.qsize() >= max_queue:
+                    # Too far behind: end the stream so the client reconnects and resyncs
+                    self.unsubscribe(subscriber)
+                    subscriber.queue.put_nowait(None)
+                else:
+                    subscriber.queue.put_nowait(message)
+
+    async def events(self, source=None):
+        """
+        SSE messages for new extractions of ``source`` (every source when
+        None), with keep-alive comments while idle, until the client leaves.
+        """
+        heartbeat = get_event_stream_config()["heartbeat"]
+        subscriber = self.subscribe(source)
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+
+extraction_tail = ExtractionTail()
@@ -0,0 +1,87 @@
+import importlib.util
+import json
+
+from fastapi import HTTPException
+from starlette.responses import Response, StreamingResponse
+
+# Response formats of the tabular endpoints: the default array of objects,
+# column arrays, or an Apache Arrow IPC stream.
+TABULAR_FORMATS = ("json", "columnar", "arrow")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def check_format(format: str, formats=TABULAR_FORMATS):
+    """
+    Reject a ``format`` query parameter the endpoint does not support.
+    """
+    if format not in formats:
+        choices = [f"'{name}'" for name in formats]
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Choose from {', '.join(choices[:-1])} or {choices[-1]}.",
+        )
+    if format == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="format=arrow requires the pyarrow package on the server.")
+
+
+def _column_arrays(columns, rows):
+    # Transpose the fetched rows once instead of building a dict per row
+    arrays = list(zip(*rows)) if rows else [()] * len(columns)
+    return {column: list(values) for column, values in zip(columns, arrays)}
+
+
+def arrow_response(arrays):
+    """
+    ``{column: values}`` arrays as an Apache Arrow IPC stream. Needs the
+    optional pyarrow package, which ``check_format`` verifies up front.
+    """
+    import pyarrow as pa
+
+    columns = {}
+    for column, values in arrays.items():
+        array = pa.array(values)
+        if pa.types.is_decimal(array.type) and array.type.scale == 0:
+            # MySQL SUM() returns DECIMAL even over integer columns
+            array = array.cast(pa.int64())
+        columns[column] = array
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+def column_response(format: str, arrays):
+    """
+    Render ``{column: values}`` arrays in the non-default ``format``: a
+    ``{"columns": [...], "values": {...}}`` body or an Arrow stream.
+    """
+    if format == "arrow":
+        return arrow_response(arrays)
+    return {"status": "success", "columns": list(arrays), "values": arrays}
+
+
+def tabular_response(format: str, columns, rows):
+    """
+    Render query rows in the non-default ``format`` ("columnar" or "arrow").
+    """
+    return column_response(format, _column_arrays(columns, rows))
+
+
+async def _ndjson_lines(sections):
+    for section, chunks, to_item in sections:
+        async for rows in chunks:
+            yield "".join(
+                json.dumps({"section": section, **to_item(row)}, default=str) + "\n" for row in rows
+            )
+
+
+def ndjson_response(sections):
+    """
+    Stream ``(section, row_chunks, to_item)`` sections as newline-delimited
+    JSON, one object per row tagged with its section. ``row_chunks`` is an
+    async iterable of row lists such as ``db.stream`` returns; rows are encoded
+    chunk by chunk as the client reads them.
+    """
+    return StreamingResponse(_ndjson_lines(sections), media_type="application/x-ndjson")
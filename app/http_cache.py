@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+import hashlib
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.cache import data_version, result_cache
+from app.config import get_http_cache_config, get_rollup_config
+from app.db import fetch_many, replica_reads
+from app.queries import Filter, params_bounds
+from app.rollups import ROLLUP_SOURCES
+from app.services import get_table_info
+
+logger = logging.getLogger(__name__)
+
+# Raw tables (see ROLLUP_SOURCES) each endpoint reads. Endpoints whose table
+# catalog spans the whole history of a source also version on its latest row.
+VERSIONED_ROUTES = {
+    "tables_summary_single_date": (("extraction", True),),
+    "tables_summary_date_range": (("extraction", False),),
+    "summary_counts": (("extraction", False), ("metrics", False)),
+    "summary_counts_date_range": (("extraction", False), ("metrics", False)),
+    "inserted_record_counts": (("extraction", False),),
+    "inserted_counts_by_date_range": (("extraction", False),),
+    "allstorage_counts": (("metrics", False),),
+    "allstorage_date_range": (("metrics", False),),
+    "open_non_open_counts": (("metrics", False),),
+    "open_non_open_counts_by_date_range": (("metrics", False),),
+    "data_breakdown": (("metrics", False),),
+    "data_by_date_range_percentage": (("metrics", False),),
+    "timeseries": (("extraction", False), ("metrics", False)),
+    "batch/summary_counts": (("extraction", False), ("metrics", False)),
+    "batch/tables_summary": (("extraction", True),),
+    "dashboard": (("extraction", False), ("metrics", False)),
+}
+
+
+def _version_query(kind, source, end, tail_start, whole_history):
+    """
+    Version probe of one table slice, or None when there is nothing to probe:
+    the latest row of the source (an index lookup) and the rows of the
+    still-open tail ``[tail_start, end)``, where late arrivals can land.
+    """
+    open_range = tail_start < end
+    if not open_range and not whole_history:
+        return None
+    spec = ROLLUP_SOURCES[kind]
+    table_info = get_table_info(spec["table_key"])
+    table = f"{table_info['database']}.{table_info['table']}"
+    time_column = spec["time_column"]
+
+    history = Filter().source(source)
+    tail, count = Filter().between(time_column, tail_start, end).source(source), "NULL"
+    if open_range:
+        count = f"(SELECT COUNT(*) FROM {table} WHERE {tail.sql})"
+    query = f"""
+        SELECT (SELECT MAX({time_column}) FROM {table} WHERE {history.sql}), {count}
+    """
+    return query, history.params + (tail.params if open_range else []), f"data_version.{kind}"
+
+
+async def fetch_data_version(route, source, start, end):
+    """
+    Cheap version of the rows an endpoint reads in ``[start, end)``. Rows are
+    appended by the extraction jobs, and only rows within the late-arrival
+    grace of the present can still change, so a range closed before that is
+    versioned by its bounds alone without a query. Otherwise the version is
+    the source's latest row, which any in-order insert moves, and the row
+    count of the open tail, which catches late arrivals.
+    """
+    grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+    # On an hour boundary so the version does not change as time passes
+    tail_start = max(start, (datetime.now() - grace).replace(minute=0, second=0, microsecond=0))
+    probes = [
+        _version_query(kind, source, end, tail_start, whole_history)
+        for kind, whole_history in VERSIONED_ROUTES[route]
+    ]
+    results = iter(await fetch_many(*(probe for probe in probes if probe is not None)))
+    return tuple(("closed",) if probe is None else tuple(next(results)[0]) for probe in probes)
+
+
+def _matches(if_none_match, etag):
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class HTTPCacheMiddleware:
+    """
+    Adds a strong ETag derived from the data version to GET responses of the
+    versioned endpoints and answers a matching If-None-Match with 304 before
+    the handler runs. Ranges that ended longer ago than the late-arrival grace
+    are cacheable for ``closed_max_age``; others, and endpoints reporting on
+    the whole history, must be revalidated. Requests failing ``validate(route,
+    query_params)`` go straight to the handler, which rejects them without
+    the cost of a version probe.
+    """
+
+    def __init__(self, app, prefix="", validate=None):
+        self.app = app
+        self.prefix = prefix
+        self.validate = validate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not get_http_cache_config()["enabled"]:
+            return await self.app(scope, receive, send)
+        route = scope["path"][len(self.prefix):].strip("/") if scope["path"].startswith(self.prefix) else None
+        if route not in VERSIONED_ROUTES:
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
+        try:
+            start, end = params_bounds(request.query_params)
+        except ValueError:
+            # Let the handler report the malformed dates
+            return await self.app(scope, receive, send)
+        if self.validate is not None and not self.validate(route, request.query_params):
+            return await self.app(scope, receive, send)
+        # The version is read where the handler's queries will go, so the
+        # body is never older than the version it is tagged and cached with
+        with replica_reads(end):
+            await self._respond(scope, receive, send, request, route, start, end)
+
+    async def _respond(self, scope, receive, send, request, route, start, end):
+        params = request.query_params
+        try:
+            version = await fetch_data_version(route, params.get("source"), start, end)
+        except Exception as e:
+            logger.warning(f"Could not compute data version for {route}: {str(e)}")
+            return await self.app(scope, receive, send)
+
+        # Gzip changes the bytes of the representation, so it is part of the
+        # tag; so is the cache generation, as a closed range's version never
+        # changes on its own when a past day is reloaded and invalidated
+        gzip = "gzip" in request.headers.get("accept-encoding", "")
+        fingerprint = repr((route, sorted(params.multi_items()), start, end, version, result_cache.generation, gzip))
+        etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+        grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+        # Totals over the whole history change with every new table or row,
+        # whatever the requested range
+        whole_history = any(history for _, history in VERSIONED_ROUTES[route])
+        if end + grace <= datetime.now() and not whole_history:
+            cache_control = f"public, max-age={get_http_cache_config()['closed_max_age']}"
+        else:
+            cache_control = "no-cache"
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if _matches(request.headers.get("if-none-match", ""), etag):
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers[name] = value
+            await send(message)
+
+        token = data_version.set(version)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            data_version.reset(token)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZip compression skipping ``excluded`` path prefixes. Event streams must
+    reach the client as written, while GZip buffers streamed bodies.
+    """
+
+    def __init__(self, app, minimum_size=500, excluded=()):
+        super().__init__(app, minimum_size=minimum_size)
+        self.excluded = tuple(excluded)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.excluded and scope["path"].startswith(self.excluded):
+            return await self.app(scope, receive, send)
+        await super().__call__(scope, receive, send)
@@ -1,10 +1,49 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import router  # Make sure routes.py is correctly set up
+from fastapi.responses import PlainTextResponse
+from app.routes import router, valid_request  # Make sure routes.py is correctly set up
+from app.admission import AdmissionMiddleware, admission
+from app.analytics import start_analytics, stop_analytics
+from app.budgets import QueryBudgetMiddleware
+from app.cache import result_cache
+from app.catalog import start_catalog, stop_catalog, table_catalog
+from app.config import get_http_cache_config, get_replica_config
+from app.db import init_pool, close_pool, get_pool, replica_stats, statement_cache_stats
+from app.events import extraction_tail
+from app.http_cache import CompressionMiddleware, HTTPCacheMiddleware
+from app import metrics
+from app.rollups import ROLLUP_SOURCES, start_rollups, stop_rollups
+from app.singleflight import single_flight
+from app.timing import ServerTimingMiddleware
 
 # Create FastAPI app instance
 app = FastAPI(title="Dynamic API")
 
+# Middleware added later wraps the earlier ones. Innermost, the /api data
+# endpoints get ETag/Cache-Control headers and 304 revalidation, inside gzip
+# compression of large bodies (except live event streams). Admission control
+# wraps both, so a request rejected with 429 has not probed the data version;
+# CORS stays outermost and also covers 304 and 429 responses.
+app.add_middleware(HTTPCacheMiddleware, prefix="/api", validate=valid_request)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=get_http_cache_config()["gzip_minimum_size"],
+    excluded=["/api/stream/"],
+)
+
+# Cost-class concurrency limits, answering 429 when a class's queue is full
+app.add_middleware(AdmissionMiddleware, prefix="/api")
+
+# Request latency by route and status, around everything but CORS
+app.add_middleware(metrics.MetricsMiddleware, excluded=["/metrics"])
+
+# Server-Timing breakdown (db, app, serialize) of every response
+app.add_middleware(ServerTimingMiddleware)
+
+# Per-route query budgets; requests whose client disconnected are cancelled.
+# Live event streams run indefinitely and handle disconnects themselves.
+app.add_middleware(QueryBudgetMiddleware, excluded=["/api/stream/"])
+
 # CORS Middleware to handle cross-origin requests
 app.add_middleware(
     CORSMiddleware,
@@ -14,9 +53,68 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Create the shared MySQL connection pool once per process and start
+# refreshing the rollup tables and exporting closed days to the analytics
+# backend when they are enabled
+@app.on_event("startup")
+def startup():
+    init_pool()
+    start_catalog()
+    start_rollups()
+    start_analytics(ROLLUP_SOURCES)
+
+@app.on_event("shutdown")
+def shutdown():
+    extraction_tail.stop()
+    stop_analytics()
+    stop_rollups()
+    stop_catalog()
+    close_pool()
+
 # Include the router that contains your endpoint logic
 app.include_router(router, prefix="/api", tags=["Dynamic Endpoints"])
 
 @app.get("/")
 def root():
     return {"message": "Dynamic API for Data Lake"}
+
+# Pool utilization, cache and request coalescing gauges, read on scrape
+metrics.GaugeCollector("db_pool", lambda: {
+    name: ("Connection pool " + name.replace("_", " ") + ".", value)
+    for name, value in get_pool().stats().items()
+})
+def _replica_gauges():
+    stats = replica_stats()
+    lags = [replica["lag"] for replica in stats["replicas"] if replica["lag"] is not None]
+    max_lag = get_replica_config()["max_lag"]
+    return {
+        "fresh": ("Read replicas lagging at most MYSQL_REPLICA_MAX_LAG.", sum(lag <= max_lag for lag in lags)),
+        "max_lag_seconds": ("Largest measured replica lag.", max(lags, default=0)),
+        "fallbacks_to_primary": ("Replica-eligible queries sent to the primary.", stats["fallbacks_to_primary"]),
+    }
+
+metrics.GaugeCollector("db_replicas", _replica_gauges)
+metrics.GaugeCollector("db_statement_cache", lambda: {
+    name: ("Prepared statement cache " + name.replace("_", " ") + ".", value)
+    for name, value in statement_cache_stats().items()
+})
+metrics.GaugeCollector("admission", lambda: {
+    f"{cost_class}_{name}": (f"Admission control {name.replace('_', ' ')} of {cost_class} requests.", value)
+    for cost_class, stats in admission.stats().items()
+    for name, value in stats.items()
+})
+metrics.GaugeCollector("result_cache", lambda: {
+    name: ("Result cache " + name.replace("_", " ") + ".", value)
+    for name, value in result_cache.stats().items()
+})
+metrics.GaugeCollector("single_flight", lambda: {
+    name: ("Request coalescing " + name.replace("_", " ") + ".", value)
+    for name, value in single_flight.stats().items()
+})
+metrics.GaugeCollector("table_catalog", lambda: {
+    "tables": ("Known tables across all sources.", sum(table_catalog.counts().values())),
+})
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,172 @@
+from bisect import bisect_left
+import contextvars
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+# Logical name of queries issued without an explicit one: the route being
+# served, set by MetricsMiddleware.
+query_label = contextvars.ContextVar("query_label", default="unnamed")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Prometheus histogram with a fixed label set. Observing is a bisect and a
+    few additions under a lock; cumulative buckets are built on scrape.
+    """
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class GaugeCollector:
+    """
+    Gauges read from ``collect()`` at scrape time, which returns
+    ``{name: (help, value)}``; names are prefixed with ``prefix``.
+    """
+
+    def __init__(self, prefix, collect):
+        self.prefix = prefix
+        self.collect = collect
+        REGISTRY.append(self)
+
+    def expose(self):
+        try:
+            gauges = self.collect()
+        except Exception:
+            # e.g. the pool is not initialised yet
+            return []
+        lines = []
+        for name, (help, value) in gauges.items():
+            lines += [f"# HELP {self.prefix}_{name} {help}", f"# TYPE {self.prefix}_{name} gauge"]
+            lines.append(f"{self.prefix}_{name} {float(value)}")
+        return lines
+
+
+REGISTRY = []
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status.",
+    ("route", "method", "status"),
+)
+query_latency = Histogram("db_query_duration_seconds", "DB query latency by logical query name.", ("query",))
+query_rows = Histogram("db_query_rows", "Rows returned per DB query by logical query name.", ("query",), ROW_BUCKETS)
+query_errors = Counter("db_query_errors_total", "Failed DB queries by logical query name.", ("query",))
+
+
+def observe_query(name, started, rows=None):
+    """
+    Record a query that began at ``perf_counter()`` ``started``; a None
+    ``rows`` records a failure.
+    """
+    name = name or query_label.get()
+    if rows is None:
+        query_errors.inc(name)
+        return
+    query_latency.observe(time.perf_counter() - started, name)
+    query_rows.observe(rows, name)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.expose()
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request by route, method and status,
+    and labels the queries it issues with its route. Paths that are not
+    routes of the app are grouped as "unmatched" to bound the series.
+    """
+
+    def __init__(self, app, excluded=()):
+        self.app = app
+        self.excluded = tuple(excluded)
+        self._paths = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded:
+            return await self.app(scope, receive, send)
+        if self._paths is None:
+            self._paths = {route.path for route in scope["app"].routes}
+        route = scope["path"] if scope["path"] in self._paths else "unmatched"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = query_label.set(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_latency.observe(time.perf_counter() - started, route, scope["method"], str(status))
+            query_label.reset(token)
@@ -0,0 +1,38 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Background thread calling ``task`` every ``interval`` seconds until
+    stopped, starting right away unless ``delay_first`` (when the caller has
+    just run it). A failing run is logged and the next one goes ahead on
+    schedule.
+    """
+
+    def __init__(self, name: str, task, interval: float, delay_first: bool = False):
+        self.name = name
+        self.task = task
+        self.interval = interval
+        self.delay_first = delay_first
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if self.delay_first and self._stop.wait(self.interval):
+            return
+        while True:
+            try:
+                self.task()
+            except Exception:
+                logger.exception(f"Error in background task {self.name}")
+            if self._stop.wait(self.interval):
+                return
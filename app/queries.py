@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+import base64
+import binascii
+import json
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def parse_date(value: str) -> datetime:
+    """
+    Parse a YYYY-MM-DD string into a midnight datetime.
+    """
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def today() -> datetime:
+    """
+    Midnight of the current day.
+    """
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Half-open [start, end) bounds for the periods used by the endpoints.
+# Predicates built from these compare the raw column, so MySQL can use an
+# index range scan instead of evaluating DATE()/YEAR() on every row.
+
+def day_bounds(day: datetime):
+    return day, day + timedelta(days=1)
+
+
+def days_bounds(start: datetime, days: int):
+    """
+    ``days`` consecutive days starting at ``start``.
+    """
+    return start, start + timedelta(days=days)
+
+
+def span_bounds(from_date: datetime, to_date: datetime):
+    """
+    Inclusive from_date..to_date range of whole days.
+    """
+    return from_date, to_date + timedelta(days=1)
+
+
+def week_bounds(day: datetime):
+    """
+    Calendar week (Monday to Sunday) containing ``day``.
+    """
+    week_start = day - timedelta(days=day.weekday())
+    return week_start, week_start + timedelta(days=7)
+
+
+def month_bounds(day: datetime):
+    """
+    Calendar month containing ``day``.
+    """
+    month_start = day.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, next_month
+
+
+def year_bounds(day: datetime):
+    """
+    Calendar year containing ``day``.
+    """
+    return day.replace(month=1, day=1), day.replace(year=day.year + 1, month=1, day=1)
+
+
+def period_bounds(day: datetime, date_range: str):
+    """
+    Calendar day, week, month or year containing ``day``.
+    """
+    if date_range == "daily":
+        return day_bounds(day)
+    if date_range == "weekly":
+        return week_bounds(day)
+    if date_range == "monthly":
+        return month_bounds(day)
+    if date_range == "yearly":
+        return year_bounds(day)
+    raise ValueError(f"Invalid date_range '{date_range}'.")
+
+
+class Filter:
+    """
+    AND-ed WHERE predicates together with their bound query parameters.
+
+    Values are always passed as parameters, so the generated SQL is the same
+    for every request and never embeds user input.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.params = []
+
+    def add(self, clause: str, *params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+        return self
+
+    def source(self, source, column: str = "source"):
+        """
+        Restrict to one source; ``None`` and ``"all"`` mean every source.
+        """
+        if source and source != "all":
+            self.add(f"{column} = %s", source)
+        return self
+
+    def between(self, column: str, start: datetime, end: datetime):
+        """
+        Half-open ``start <= column < end`` range on the raw column.
+        """
+        return self.add(f"{column} >= %s AND {column} < %s", start, end)
+
+    def sources(self, sources, column: str = "source"):
+        """
+        Restrict to any of ``sources``; an empty list or one containing
+        ``"all"`` means every source.
+        """
+        if sources and "all" not in sources:
+            self.add(f"{column} IN ({', '.join(['%s'] * len(sources))})", *sources)
+        return self
+
+    def days(self, column: str, days):
+        """
+        Any of the whole ``days``, as OR-ed half-open ranges on the raw column.
+        Consecutive days are merged into one range.
+        """
+        spans = []
+        for day in sorted(set(days)):
+            if spans and spans[-1][1] == day:
+                spans[-1][1] = day + timedelta(days=1)
+            else:
+                spans.append(list(day_bounds(day)))
+        clause = " OR ".join(f"{column} >= %s AND {column} < %s" for _ in spans)
+        return self.add(f"({clause})", *(value for span in spans for value in span))
+
+    @property
+    def sql(self) -> str:
+        return " AND ".join(self.clauses) if self.clauses else "1=1"
+
+
+def request_bounds(date=None, from_date=None, to_date=None, date_range=None, dates=None):
+    """
+    Widest ``[start, end)`` a request can read, from its date parameters
+    (``dates`` is a comma-separated list). Missing dates default to today
+    like the endpoints do. Raises ValueError for malformed dates.
+    """
+    if dates:
+        days = [parse_date(day.strip()) for day in dates.split(",") if day.strip()]
+        if days:
+            return span_bounds(min(days), max(days))
+    if from_date or to_date:
+        start = parse_date(from_date or to_date)
+        end = parse_date(to_date or from_date)
+        return span_bounds(min(start, end), max(start, end))
+    day = parse_date(date) if date else today()
+    if date_range in (None, "daily"):
+        return day_bounds(day)
+    # Weekly/monthly mean the calendar period for some endpoints and the
+    # 7/30 days from ``day`` for others, so cover both.
+    rolling_days = {"weekly": 7, "monthly": 30, "yearly": 0}.get(date_range, 0)
+    start, end = period_bounds(day, date_range)
+    return min(start, day), max(end, day + timedelta(days=rolling_days))
+
+
+def params_bounds(params):
+    """
+    ``request_bounds`` of a request from its query parameters (any mapping);
+    breakdown_type stands in for date_range. Raises ValueError for malformed
+    dates.
+    """
+    return request_bounds(
+        params.get("date"), params.get("from_date"), params.get("to_date"),
+        params.get("date_range") or params.get("breakdown_type"),
+        params.get("dates"),
+    )
+
+
+def encode_cursor(section: str, key) -> str:
+    """
+    Opaque pagination cursor pointing just past ``key`` in list ``section``.
+    """
+    payload = json.dumps([section, list(key)], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Inverse of ``encode_cursor``. Raises ValueError for malformed cursors.
+    """
+    try:
+        section, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(section, str) or not isinstance(key, list):
+            raise ValueError(cursor)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    return section, key
+
+
+def keyset_predicate(keys, after):
+    """
+    Predicate (and its params) for the rows that sort after the ``after``
+    keyset in ``keys`` order. It is spelled out column by column with
+    NULL-safe equality so that a NULL key, which MySQL sorts first, stays
+    distinct from an empty string.
+    """
+    disjuncts, params = [], []
+    for index, (key, value) in enumerate(zip(keys, after)):
+        equal = [f"{previous} <=> %s" for previous in keys[:index]]
+        params.extend(after[:index])
+        if value is None:
+            disjuncts.append(" AND ".join(equal + [f"{key} IS NOT NULL"]))
+        else:
+            disjuncts.append(" AND ".join(equal + [f"{key} > %s"]))
+            params.append(value)
+    return Filter().add(f"({' OR '.join(f'({disjunct})' for disjunct in disjuncts)})", *params)
+
+
+def keyset_page(query: str, params, keys, after=None, limit: int = 50, clause: str = "HAVING"):
+    """
+    Extend ``query`` to return the ``limit + 1`` rows following the ``after``
+    keyset in ``keys`` order. The seek predicate is appended with ``clause``:
+    HAVING after a GROUP BY, AND after a WHERE, so the server filters the
+    rows of the query itself rather than those of a derived table. Seeking on
+    the keyset instead of using OFFSET keeps deep pages as cheap as the first;
+    the extra row tells whether a next page exists.
+    """
+    filters = keyset_predicate(keys, after) if after is not None else Filter()
+    sql = f"""
+    {query}
+    {f"{clause} {filters.sql}" if after is not None else ""}
+    ORDER BY {', '.join(keys)}
+    LIMIT %s
+    """
+    return sql, list(params) + filters.params + [limit + 1]
@@ -0,0 +1,290 @@
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+from app.config import get_rollup_config
+from app import analytics
+from app.db import execute_query, execute_transaction, fetch_many, run_db
+from app.periodic import PeriodicTask
+from app.queries import Filter
+from app.services import get_table_info
+
+logger = logging.getLogger(__name__)
+
+# Raw tables that are rolled up, with the timestamp column that buckets them
+# and the additive metric columns kept per (source, hour) and (source, day).
+# Raw rows without a source are rolled up under the empty source.
+ROLLUP_SOURCES = {
+    "extraction": {
+        "table_key": "db2",
+        "time_column": "extractedtime",
+        "columns": ["insertedreccount", "extractedreccount"],
+    },
+    "metrics": {
+        "table_key": "db1",
+        "time_column": "EodMarker",
+        "columns": [
+            "AllStorage", "Open", "NonOpen", "StorageDuplicates",
+            "InsertOpen", "UpdateOpen", "DeletesNonOpen", "DiffenDuplicates",
+        ],
+    },
+}
+
+# Rows below the high-water mark are served from the rollup tables; the cache
+# is filled by refresh() and stays empty (raw reads only) while rollups are off.
+_watermarks = {}
+
+# Refresh in chunks so a first backfill does not run as one huge transaction.
+REFRESH_CHUNK = timedelta(days=1)
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rollup_table(kind: str, level: str) -> str:
+    return f"{get_rollup_config()['database']}.{kind}_rollup_{level}"
+
+
+def _watermark_table() -> str:
+    return f"{get_rollup_config()['database']}.rollup_watermarks"
+
+
+def _raw_table(kind: str) -> str:
+    table_info = get_table_info(ROLLUP_SOURCES[kind]["table_key"])
+    return f"{table_info['database']}.{table_info['table']}"
+
+
+def ensure_rollup_tables():
+    """
+    Create the rollup and watermark tables if they do not exist yet.
+    """
+    statements = [(
+        f"""
+        CREATE TABLE IF NOT EXISTS {_watermark_table()} (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            high_water DATETIME NOT NULL
+        )
+        """,
+        None,
+    )]
+    for kind, spec in ROLLUP_SOURCES.items():
+        metric_columns = ", ".join(f"{column} BIGINT NOT NULL DEFAULT 0" for column in spec["columns"])
+        for level, bucket_type in (("hourly", "DATETIME"), ("daily", "DATE")):
+            statements.append((
+                f"""
+                CREATE TABLE IF NOT EXISTS {_rollup_table(kind, level)} (
+                    bucket {bucket_type} NOT NULL,
+                    source VARCHAR(255) NOT NULL,
+                    {metric_columns},
+                    PRIMARY KEY (bucket, source)
+                )
+                """,
+                None,
+            ))
+    execute_transaction(statements)
+
+
+def load_watermarks():
+    """
+    Read the persisted high-water marks into the in-process cache.
+    """
+    rows = execute_query(f"SELECT name, high_water FROM {_watermark_table()}", name="rollup.watermarks")
+    _watermarks.update({name: high_water for name, high_water in rows if name in ROLLUP_SOURCES})
+    return dict(_watermarks)
+
+
+def refresh(kind: str, now: datetime = None):
+    """
+    Roll up every closed hour between the high-water mark and the start of
+    the current hour, then recompute the daily rows those hours belong to.
+
+    Rows arriving up to ``late_arrival_grace`` seconds behind the mark are
+    picked up because the hours just below it are re-aggregated each time.
+    """
+    spec = ROLLUP_SOURCES[kind]
+    time_column = spec["time_column"]
+    columns = spec["columns"]
+    target = _floor_hour(now or datetime.now())
+
+    high_water = _watermarks.get(kind)
+    if high_water is None:
+        rows = execute_query(f"SELECT high_water FROM {_watermark_table()} WHERE name = %s", [kind], "rollup.watermarks")
+        high_water = rows[0][0] if rows else None
+    if high_water is None:
+        rows = execute_query(f"SELECT MIN({time_column}) FROM {_raw_table(kind)}", name=f"rollup.{kind}.start")
+        if not rows or rows[0][0] is None:
+            return None
+        chunk_start = _floor_hour(rows[0][0])
+    else:
+        grace = timedelta(seconds=get_rollup_config()["late_arrival_grace"])
+        chunk_start = _floor_hour(high_water - grace)
+
+    sums = ", ".join(f"SUM({column})" for column in columns)
+    updates = ", ".join(f"{column} = VALUES({column})" for column in columns)
+    column_list = ", ".join(columns)
+
+    while chunk_start < target:
+        chunk_end = min(chunk_start + REFRESH_CHUNK, target)
+        hourly_sql = f"""
+            INSERT INTO {_rollup_table(kind, 'hourly')} (bucket, source, {column_list})
+            SELECT DATE_ADD(DATE({time_column}), INTERVAL HOUR({time_column}) HOUR) AS hour_bucket,
+                   COALESCE(source, '') AS source_key, {sums}
+            FROM {_raw_table(kind)}
+            WHERE {time_column} >= %s AND {time_column} < %s
+            GROUP BY hour_bucket, source_key
+            ON DUPLICATE KEY UPDATE {updates}
+        """
+        daily_sql = f"""
+            INSERT INTO {_rollup_table(kind, 'daily')} (bucket, source, {column_list})
+            SELECT DATE(bucket) AS day_bucket, source, {sums}
+            FROM {_rollup_table(kind, 'hourly')}
+            WHERE bucket >= %s AND bucket < %s
+            GROUP BY day_bucket, source
+            ON DUPLICATE KEY UPDATE {updates}
+        """
+        watermark_sql = f"""
+            INSERT INTO {_watermark_table()} (name, high_water) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE high_water = GREATEST(high_water, VALUES(high_water))
+        """
+        execute_transaction([
+            (hourly_sql, [chunk_start, chunk_end]),
+            (daily_sql, [_floor_day(chunk_start), chunk_end]),
+            (watermark_sql, [kind, chunk_end]),
+        ])
+        if _watermarks.get(kind) is None or _watermarks[kind] < chunk_end:
+            _watermarks[kind] = chunk_end
+        chunk_start = chunk_end
+    return _watermarks.get(kind)
+
+
+def refresh_all(now: datetime = None):
+    for kind in ROLLUP_SOURCES:
+        try:
+            refresh(kind, now)
+        except Exception as e:
+            logger.error(f"Error refreshing {kind} rollups: {str(e)}")
+
+
+def _bucket_expression(time_column: str, bucket):
+    if bucket == "hour":
+        return f"DATE_ADD(DATE({time_column}), INTERVAL HOUR({time_column}) HOUR)"
+    if bucket == "day":
+        return f"DATE({time_column})"
+    if bucket == "month":
+        return f"DATE_SUB(DATE({time_column}), INTERVAL DAYOFMONTH({time_column}) - 1 DAY)"
+    if bucket is None:
+        return "NULL"
+    raise ValueError(f"Invalid bucket '{bucket}'.")
+
+
+def _normalize_key(key, bucket):
+    if key is None or bucket == "hour":
+        return key
+    return key.date() if isinstance(key, datetime) else key
+
+
+async def aggregate(kind: str, source, start: datetime, end: datetime, bucket, columns=None):
+    """
+    Sum metric ``columns`` of a raw table over ``[start, end)`` grouped by
+    ``bucket`` ("hour", "day", "month" or None for a single total row).
+
+    Days exported to the analytics backend are aggregated by DuckDB from
+    Parquet; closed periods below the high-water mark are read from the daily
+    and hourly rollups; only the still-open tail is aggregated from raw rows.
+    Returns ``(bucket_key, *sums)`` tuples ordered by bucket.
+    """
+    spec = ROLLUP_SOURCES[kind]
+    columns = columns or spec["columns"]
+
+    analytics_fetch = None
+    store = analytics.analytics_store
+    coverage = store.coverage(kind) if store is not None else None
+    if coverage is not None and start < coverage[1]:
+        # Nothing precedes the first exported day, which is the first raw row's
+        analytics_end = min(end, coverage[1])
+        analytics_fetch = run_db(store.aggregate, kind, spec, source, start, analytics_end, bucket, columns)
+        start = analytics_end
+
+    # Split the rest of [start, end) into (level, table, time column, part start, part end)
+    parts = []
+    high_water = _watermarks.get(kind) if get_rollup_config()["enabled"] else None
+    if high_water is not None and start < high_water:
+        rollup_end = min(end, high_water)
+        if bucket != "hour" and start == _floor_day(start):
+            day_end = max(start, _floor_day(rollup_end))
+            parts.append(("daily", _rollup_table(kind, "daily"), "bucket", start, day_end))
+            parts.append(("hourly", _rollup_table(kind, "hourly"), "bucket", day_end, rollup_end))
+        else:
+            parts.append(("hourly", _rollup_table(kind, "hourly"), "bucket", start, rollup_end))
+        start = rollup_end
+    parts.append(("raw", _raw_table(kind), spec["time_column"], start, end))
+
+    sums = ", ".join(f"SUM({column})" for column in columns)
+    queries = []
+    for level, table, time_column, part_start, part_end in parts:
+        if part_start >= part_end:
+            continue
+        # A NULL raw source and the empty rolled-up one are only read unfiltered,
+        # as a source filter is never empty, so both levels match the same rows
+        filters = Filter().between(time_column, part_start, part_end).source(source)
+        group_by = "" if bucket is None else "GROUP BY bucket_key"
+        queries.append((
+            f"""
+            SELECT {_bucket_expression(time_column, bucket)} AS bucket_key, {sums}
+            FROM {table}
+            WHERE {filters.sql}
+            {group_by}
+            """,
+            filters.params,
+            f"aggregate.{kind}.{level}",
+        ))
+
+    if analytics_fetch is None:
+        results = await fetch_many(*queries)
+    else:
+        analytics_rows, results = await asyncio.gather(analytics_fetch, fetch_many(*queries))
+        results.append(analytics_rows)
+
+    totals = {}
+    for rows in results:
+        for row in rows:
+            key = _normalize_key(row[0], bucket)
+            values = totals.setdefault(key, [0] * len(columns))
+            for i, value in enumerate(row[1:]):
+                values[i] += value or 0
+    if bucket is None and not totals:
+        totals[None] = [0] * len(columns)
+    return [(key, *totals[key]) for key in sorted(totals, key=lambda key: (key is None, key))]
+
+
+_refresher = None
+
+
+def start_rollups():
+    """
+    Create the rollup tables and start the refresher when rollups are enabled.
+    """
+    global _refresher
+    config = get_rollup_config()
+    if not config["enabled"] or _refresher is not None:
+        return
+    try:
+        ensure_rollup_tables()
+        load_watermarks()
+    except Exception as e:
+        logger.error(f"Could not initialize rollup tables: {str(e)}")
+        return
+    _refresher = PeriodicTask("rollup-refresher", refresh_all, config["refresh_interval"])
+    _refresher.start()
+
+
+def stop_rollups():
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
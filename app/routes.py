@@ -1,24 +1,171 @@
+import logging
+from bisect import bisect_right
 from typing import Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.dependencies.utils import request_params_to_args
+from fastapi.routing import APIRoute
 from app.services import get_table_info
-from app.db import execute_query
+from app.db import QueryTimeout, fetch, fetch_many, get_pool, replica_stats, statement_cache_stats, stream
+from app.catalog import table_catalog
+from app.events import extraction_tail
+from app.formats import check_format, column_response, ndjson_response, tabular_response
+from app.cache import cached, result_cache
+from app.singleflight import single_flight
+from app.rollups import aggregate
+from app.queries import (
+    Filter, parse_date, today, day_bounds, days_bounds, span_bounds,
+    period_bounds, decode_cursor, encode_cursor, keyset_page,
+)
+from app.timing import TimedRoute
+from app.timeseries import GRANULARITIES, MAX_BUCKETS, METRICS, bucket_count, timeseries, to_months, window
 from fastapi import Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TimedRoute)
+
+DEFAULT_PAGE_SIZE = 50
+
+# Keyset (sort order) of each paginated table list. Failed groups also key on
+# status and message so that every row has a unique position.
+SINGLE_DATE_PAGE_KEYS = {
+    "total_tables": ("source", "tablename"),
+    "tables_not_extracted": ("source", "tablename"),
+    "successful_extractions": ("source", "tablename"),
+    "failed_extractions": ("source", "tablename", "status", "status_message"),
+}
+DATE_RANGE_PAGE_KEYS = {
+    "total_tables": ("source", "tablename"),
+    "tables_not_extracted": ("days.day", "catalog.source", "catalog.tablename"),
+    "successful_extractions": ("extraction_date", "source", "tablename"),
+    "failed_extractions": ("extraction_date", "source", "tablename", "status", "status_message"),
+}
+# Keys holding a YYYY-MM-DD date, and those that may be NULL
+DATE_PAGE_KEYS = {"days.day", "extraction_date"}
+NULLABLE_PAGE_KEYS = {"status_message"}
+
+
+def _server_error(e: Exception):
+    """
+    504 for queries stopped by the request's execution budget, 500 otherwise.
+    Errors the handler raised for its parameters are answered as they are.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    return HTTPException(status_code=504 if isinstance(e, QueryTimeout) else 500, detail=str(e))
+
+
+def _page_request(limit, cursor, page_keys):
+    """
+    Resolve the limit/cursor parameters to ``(limit, section, key)``, or None
+    when the lists are not paginated. A cursor continues only its own list.
+    """
+    if limit is None and cursor is None:
+        return None
+    if cursor is None:
+        return limit, None, None
+    try:
+        section, key = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if section not in page_keys or len(key) != len(page_keys[section]):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    try:
+        key = [_page_key_value(name, value) for name, value in zip(page_keys[section], key)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return limit or DEFAULT_PAGE_SIZE, section, key
+
+
+def _page_key_value(name, value):
+    """
+    Decode one value of a cursor's keyset. Raises TypeError or ValueError
+    when it does not fit the key.
+    """
+    if name in DATE_PAGE_KEYS:
+        return parse_date(value)
+    if value is None and name in NULLABLE_PAGE_KEYS:
+        return None
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+
+async def _fetch_pages(lists, page_keys, limit, section=None, key=None):
+    """
+    Fetch one page of each ``section -> (query, params, clause, key_of,
+    to_item)`` list concurrently, or only the page of ``section`` following
+    ``key``. ``clause`` appends the seek predicate to the query (see
+    keyset_page).
+    """
+    names = [section] if section else list(lists)
+    pages = await fetch_many(*(
+        keyset_page(
+            lists[name][0], lists[name][1], page_keys[name], key if name == section else None, limit, lists[name][2],
+        )
+        for name in names
+    ))
+    result = {}
+    for name, rows in zip(names, pages):
+        _, _, _, key_of, to_item = lists[name]
+        result[name] = {
+            "data": [to_item(row) for row in rows[:limit]],
+            "next_cursor": encode_cursor(name, key_of(rows[limit - 1])) if len(rows) > limit else None,
+        }
+    return result
+
+
+def _list_page(name, items, to_item, limit, key=None):
+    """
+    One page of a sorted in-memory list of key tuples, after ``key``.
+    """
+    start = bisect_right(items, tuple(key)) if key else 0
+    rows = items[start:start + limit + 1]
+    return {
+        "data": [to_item(row) for row in rows[:limit]],
+        "next_cursor": encode_cursor(name, rows[limit - 1]) if len(rows) > limit else None,
+    }
+
+
+async def _known_tables(source, classification_rows):
+    """
+    Every known ``(source, tablename)`` of ``source`` (sorted) and the set of
+    those attempted in ``classification_rows``. Tables extracted since the
+    catalog's last refresh are added from the rows themselves.
+    """
+    await table_catalog.ensure_loaded()
+    tables = table_catalog.tables(source)
+    attempted = {tuple(row[:2]) for row in classification_rows}
+    unknown = table_catalog.unknown(attempted)
+    if unknown:
+        tables = sorted(tables + unknown)
+    return tables, attempted
+
 
 @router.get("/tables_summary_single_date")
-def tables_summary_single_date(
+@cached
+async def tables_summary_single_date(
     source: Optional[str] = Query(None, description="Filter by source"),
     date: Optional[str] = Query(None, description="Single date in YYYY-MM-DD format"),
+    counts_only: bool = Query(False, description="Return only the counts, without the table lists"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size of each table list"),
+    cursor: Optional[str] = Query(None, description="next_cursor of a list, to fetch its following page"),
 ):
     """
     Retrieve tables summary for a single date, including total tables,
     tables not extracted, successful extractions, and failed extractions.
+
+    With limit or cursor each list is paginated and carries a next_cursor;
+    use counts_only for the totals.
     """
+    page_request = _page_request(limit, cursor, SINGLE_DATE_PAGE_KEYS)
+
     try:
         # Get database and table info dynamically
         table_info = get_table_info("db2")
+        table = f"{table_info['database']}.{table_info['table']}"
 
         # Get current date if date is not provided
         current_date = datetime.now().strftime('%Y-%m-%d')
@@ -26,39 +173,46 @@ def tables_summary_single_date(
             date = current_date
 
         # Construct the query filters for source and date
-        source_filter = ""
-        total_tables_filter = ""
+        day_start, day_end = day_bounds(parse_date(date))
+        extraction_filter = Filter().between("extractedtime", day_start, day_end).source(source)
 
-        if source and source != "all":
-            # Filter for a specific source
-            source_filter = f"AND source = '{source}'"
-            total_tables_filter = f"WHERE source = '{source}'"
-        else:
-            # For 'all', include all sources for the given date
-            source_filter = f"AND DATE(extractedtime) = '{date}'"
-
-        # Query to get all distinct tables
-        total_tables_query = f"""
-        SELECT DISTINCT source, tablename 
-        FROM {table_info['database']}.{table_info['table']}
-        {total_tables_filter}
+        # Classify the tables extracted on the date: extracted successfully
+        # and/or failed, with their number of distinct failures
+        classification_query = f"""
+        SELECT 
+            source,
+            tablename,
+            MAX(status = 'success') AS has_success,
+            MAX(status != 'success') AS has_failure,
+            COUNT(DISTINCT CASE WHEN status != 'success'
+                  THEN CONCAT_WS(CHAR(0), status, status_message) END) AS failure_groups
+        FROM {table}
+        WHERE {extraction_filter.sql}
+        GROUP BY source, tablename
         """
-        total_tables_data = execute_query(total_tables_query)
-        total_tables_list = [
-            {"source": row[0], "tablename": row[1]} for row in total_tables_data
-        ]
-        total_tables_set = {(row[0], row[1]) for row in total_tables_data}
+
+        if counts_only:
+            classification_data = await fetch(
+                classification_query, extraction_filter.params, "tables_summary_single_date.classification"
+            )
+            total_tables, attempted = await _known_tables(source, classification_data)
+            return {
+                "status": "success",
+                "total_tables": {"count": len(total_tables)},
+                "tables_not_extracted": {"count": len(total_tables) - len(attempted)},
+                "successful_extractions": {"total_records": sum(row[2] for row in classification_data)},
+                "failed_extractions": {"total_records": sum(row[4] for row in classification_data)},
+            }
 
         # Query for successful extractions
         success_query = f"""
         SELECT 
             source,
             tablename,
-            MAX(DATE_FORMAT(extractedtime, '%H:%i:%s')) AS latest_time,
+            MAX(DATE_FORMAT(extractedtime, '%%H:%%i:%%s')) AS latest_time,
             status
-        FROM {table_info['database']}.{table_info['table']}
-        WHERE DATE(extractedtime) = '{date}'
-        {source_filter}
+        FROM {table}
+        WHERE {extraction_filter.sql}
         AND status = 'success'
         GROUP BY source, tablename, status
         """
@@ -68,36 +222,29 @@ def tables_summary_single_date(
         SELECT 
             source,
             tablename,
-            MAX(DATE_FORMAT(extractedtime, '%H:%i:%s')) AS latest_time,
+            MAX(DATE_FORMAT(extractedtime, '%%H:%%i:%%s')) AS latest_time,
             status,
             status_message
-        FROM {table_info['database']}.{table_info['table']}
-        WHERE DATE(extractedtime) = '{date}'
-        {source_filter}
+        FROM {table}
+        WHERE {extraction_filter.sql}
         AND status != 'success'
         GROUP BY source, tablename, status, status_message
         """
 
-        # Execute queries
-        success_data = execute_query(success_query)
-        failed_data = execute_query(failed_query)
+        def total_table_item(row):
+            return {"source": row[0], "tablename": row[1]}
 
-        # Process successful extractions
-        success_result = [
-            {
+        def success_item(row):
+            return {
                 "date": date,
                 "time": row[2],  # latest_time
                 "source": row[0],
                 "tablename": row[1],
                 "status": "success"
             }
-            for row in success_data
-        ]
-        success_tables_set = {(row[0], row[1]) for row in success_data}  # (source, tablename)
 
-        # Process failed extractions
-        failed_result = [
-            {
+        def failed_item(row):
+            return {
                 "date": date,
                 "time": row[2],  # latest_time
                 "source": row[0],
@@ -105,17 +252,45 @@ def tables_summary_single_date(
                 "status": row[3],
                 "status_message": row[4],
             }
-            for row in failed_data
-        ]
-        failed_tables_set = {(row[0], row[1]) for row in failed_data}  # (source, tablename)
-
-        # Calculate tables not extracted
-        processed_tables_set = success_tables_set | failed_tables_set
-        not_extracted_tables_set = total_tables_set - processed_tables_set
-        not_extracted_list = [
-            {"source": source, "tablename": tablename}
-            for source, tablename in not_extracted_tables_set
-        ]
+
+        if page_request:
+            limit, section, key = page_request
+            lists = {
+                "successful_extractions": (
+                    success_query, extraction_filter.params, "HAVING", lambda row: row[:2], success_item,
+                ),
+                "failed_extractions": (
+                    failed_query, extraction_filter.params, "HAVING",
+                    lambda row: (row[0], row[1], row[3], row[4]), failed_item,
+                ),
+            }
+            pages = {}
+            if section is None or section in ("total_tables", "tables_not_extracted"):
+                classification_data = await fetch(
+                    classification_query, extraction_filter.params, "tables_summary_single_date.classification"
+                )
+                total_tables, attempted = await _known_tables(source, classification_data)
+                for name, tables in (
+                    ("total_tables", total_tables),
+                    ("tables_not_extracted", [table for table in total_tables if table not in attempted]),
+                ):
+                    if section in (None, name):
+                        pages[name] = _list_page(name, tables, total_table_item, limit, key if section else None)
+            if section is None or section in lists:
+                pages.update(await _fetch_pages(lists, SINGLE_DATE_PAGE_KEYS, limit, section, key))
+            return {"status": "success", **pages}
+
+        # Execute the independent queries concurrently
+        classification_data, success_data, failed_data = await fetch_many(
+            (classification_query, extraction_filter.params, "tables_summary_single_date.classification"),
+            (success_query, extraction_filter.params, "tables_summary_single_date.successful"),
+            (failed_query, extraction_filter.params, "tables_summary_single_date.failed"),
+        )
+        total_tables, attempted = await _known_tables(source, classification_data)
+        total_tables_list = [total_table_item(table) for table in total_tables]
+        not_extracted_list = [total_table_item(table) for table in total_tables if table not in attempted]
+        success_result = [success_item(row) for row in success_data]
+        failed_result = [failed_item(row) for row in failed_data]
 
         # Return the results as a JSON response
         return {
@@ -139,49 +314,133 @@ def tables_summary_single_date(
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
+
+
+# Upper bound on the days of a tables_summary_date_range request
+MAX_RANGE_DAYS = 1000
+
+
+def _date_range_page_request(format, limit, cursor):
+    check_format(format, ("json", "ndjson"))
+    page_request = _page_request(limit, cursor, DATE_RANGE_PAGE_KEYS)
+    if page_request and format == "ndjson":
+        raise HTTPException(status_code=400, detail="limit and cursor cannot be combined with format=ndjson.")
+    return page_request
+
+
+def _summary_range(from_date, to_date):
+    """
+    ``[start, end)`` of a tables_summary_date_range request, today by default.
+    """
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    try:
+        range_start, range_end = span_bounds(parse_date(from_date or current_date), parse_date(to_date or current_date))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    # The calendar of days is a recursive CTE, which the server stops after
+    # cte_max_recursion_depth (default 1000) iterations
+    if (range_end - range_start).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range too long: at most {MAX_RANGE_DAYS} days per request.")
+    return range_start, range_end
 
 
 @router.get("/tables_summary_date_range")
-def tables_summary_date_range(
+@cached
+async def tables_summary_date_range(
     source: Optional[str] = Query(None, description="Filter by source"),
     from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    counts_only: bool = Query(False, description="Return only the counts, without the table lists"),
+    format: str = Query("json", description="Response format: 'json' or 'ndjson' to stream the table lists"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size of each table list"),
+    cursor: Optional[str] = Query(None, description="next_cursor of a list, to fetch its following page"),
 ):
     """
     Retrieve tables summary including total tables, 
     tables not extracted, successful extractions, and failed extractions.
+    Tables not extracted are broken down per day: a table seen in the range
+    counts as missing on every day without a successful extraction.
+
+    With format=ndjson the lists are streamed as one JSON object per line,
+    each tagged with its section, straight from server-side cursors. With
+    limit or cursor each list is paginated and carries a next_cursor; use
+    counts_only for the totals.
     """
+    page_request = _date_range_page_request(format, limit, cursor)
+    range_start, range_end = _summary_range(from_date, to_date)
+
     try:
         # Get database and table info dynamically
         table_info = get_table_info("db2")
-
-        # Get current date if from_date or to_date is not provided
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        if from_date is None:
-            from_date = current_date
-        if to_date is None:
-            to_date = current_date
+        table = f"{table_info['database']}.{table_info['table']}"
 
         # Construct the query filters for source and date range
-        source_filter = ""
-        total_tables_filter = f"WHERE DATE(extractedtime) BETWEEN '{from_date}' AND '{to_date}'"
+        extraction_filter = Filter().between("extractedtime", range_start, range_end).source(source)
+
+        # Tables seen in the range, crossed with every day of the range and
+        # anti-joined with the tables extracted successfully on that day
+        missing_from = f"""
+        WITH RECURSIVE days AS (
+            SELECT CAST(%s AS DATE) AS day
+            UNION ALL
+            SELECT day + INTERVAL 1 DAY FROM days WHERE day + INTERVAL 1 DAY < %s
+        )
+        SELECT {{columns}}
+        FROM (
+            SELECT source, tablename FROM {table}
+            WHERE {extraction_filter.sql}
+            GROUP BY source, tablename
+        ) catalog
+        CROSS JOIN days
+        LEFT JOIN (
+            SELECT DATE(extractedtime) AS day, source, tablename FROM {table}
+            WHERE {extraction_filter.sql} AND status = 'success'
+            GROUP BY DATE(extractedtime), source, tablename
+        ) extracted
+            ON extracted.day = days.day
+            AND extracted.source = catalog.source
+            AND extracted.tablename = catalog.tablename
+        WHERE extracted.source IS NULL
+        """
+        missing_params = [range_start, range_end] + extraction_filter.params * 2
+        missing_counts_query = missing_from.format(columns="days.day, COUNT(*)") + "GROUP BY days.day ORDER BY days.day"
 
-        if source and source != "all":
-            source_filter = f"AND source = '{source}'"
-            total_tables_filter += f" AND source = '{source}'"
+        if counts_only:
+            counts_query = f"""
+            SELECT 
+                COUNT(DISTINCT source, tablename),
+                COUNT(DISTINCT CASE WHEN status = 'success'
+                      THEN CONCAT_WS(CHAR(0), DATE(extractedtime), source, tablename) END),
+                COUNT(DISTINCT CASE WHEN status != 'success'
+                      THEN CONCAT_WS(CHAR(0), DATE(extractedtime), source, tablename, status, status_message) END)
+            FROM {table}
+            WHERE {extraction_filter.sql}
+            """
+            counts_data, missing_counts = await fetch_many(
+                (counts_query, extraction_filter.params, "tables_summary_date_range.counts"),
+                (missing_counts_query, missing_params, "tables_summary_date_range.not_extracted_counts"),
+            )
+            total, successful, failed = counts_data[0]
+            by_date = [{"date": row[0], "count": row[1]} for row in missing_counts]
+            return {
+                "status": "success",
+                "total_tables": {"count": total},
+                "tables_not_extracted": {"count": sum(day["count"] for day in by_date), "by_date": by_date},
+                "successful_extractions": {"total_records": successful},
+                "failed_extractions": {"total_records": failed},
+            }
 
         # Query to get all distinct tables for the source (or all sources if source is 'all')
         total_tables_query = f"""
         SELECT DISTINCT source, tablename 
-        FROM {table_info['database']}.{table_info['table']}
-        {total_tables_filter}
+        FROM {table}
+        WHERE {extraction_filter.sql}
         """
-        total_tables_data = execute_query(total_tables_query)
-        total_tables_list = [
-            {"source": row[0], "tablename": row[1]} for row in total_tables_data
-        ]
-        total_tables_set = {(row[0], row[1]) for row in total_tables_data}
+        missing_query = (
+            missing_from.format(columns="days.day, catalog.source, catalog.tablename")
+            + "ORDER BY days.day, catalog.source, catalog.tablename"
+        )
 
         # Construct the base query for successful extractions with latest time for each date
         success_query = f"""
@@ -189,11 +448,10 @@ def tables_summary_date_range(
             DATE(extractedtime) AS extraction_date,
             source,
             tablename,
-            MAX(DATE_FORMAT(extractedtime, '%H:%i:%s')) AS latest_time,
+            MAX(DATE_FORMAT(extractedtime, '%%H:%%i:%%s')) AS latest_time,
             status
-        FROM {table_info['database']}.{table_info['table']}
-        WHERE DATE(extractedtime) BETWEEN '{from_date}' AND '{to_date}'
-        {source_filter}
+        FROM {table}
+        WHERE {extraction_filter.sql}
         AND status = 'success'
         GROUP BY extraction_date, source, tablename, status
         """
@@ -204,35 +462,32 @@ def tables_summary_date_range(
             DATE(extractedtime) AS extraction_date,
             source,
             tablename,
-            MAX(DATE_FORMAT(extractedtime, '%H:%i:%s')) AS latest_time,
+            MAX(DATE_FORMAT(extractedtime, '%%H:%%i:%%s')) AS latest_time,
             status,
             status_message
-        FROM {table_info['database']}.{table_info['table']}
-        WHERE DATE(extractedtime) BETWEEN '{from_date}' AND '{to_date}'
-        {source_filter}
+        FROM {table}
+        WHERE {extraction_filter.sql}
         AND status != 'success'
         GROUP BY extraction_date, source, tablename, status, status_message
         """
 
-        # Execute queries
-        success_data = execute_query(success_query)  # Query for successful extractions
-        failed_data = execute_query(failed_query)  # Query for failed extractions
+        def total_table_item(row):
+            return {"source": row[0], "tablename": row[1]}
+
+        def not_extracted_item(row):
+            return {"date": row[0], "source": row[1], "tablename": row[2]}
 
-        # Convert successful extractions into structured response
-        success_result = [
-            {
+        def success_item(row):
+            return {
                 "date": row[0],  # extraction_date from the query
                 "time": row[3],  # latest_time from the query
                 "source": row[1],
                 "tablename": row[2],
                 "status": "success"
             }
-            for row in success_data
-        ]
 
-        # Convert failed extractions into structured response
-        failed_result = [
-            {
+        def failed_item(row):
+            return {
                 "date": row[0],  # extraction_date from the query
                 "time": row[3],  # latest_time from the query
                 "source": row[1],
@@ -240,15 +495,66 @@ def tables_summary_date_range(
                 "status": row[4],  # status for failed extraction
                 "status_message": row[5],
             }
-            for row in failed_data
-        ]
-
-        # Calculate distinct successfully extracted tables
-        success_tables_set = {(entry["source"], entry["tablename"]) for entry in success_result}
 
-        # Calculate tables not extracted (difference between total and successful)
-        not_extracted_tables_set = total_tables_set - success_tables_set
-        not_extracted_list = [{"source": source, "tablename": tablename} for source, tablename in not_extracted_tables_set]
+        if page_request:
+            # Rows after a cursor's date cannot precede it, so start the
+            # scan (and the calendar of days) there instead of at from_date
+            page_limit, page_section, page_key = page_request
+            page_params = extraction_filter.params
+            page_missing_params = missing_params
+            if page_section in ("tables_not_extracted", "successful_extractions", "failed_extractions"):
+                page_start = max(range_start, page_key[0])
+                page_params = Filter().between("extractedtime", page_start, range_end).source(source).params
+                page_missing_params = [page_start] + missing_params[1:]
+            pages = await _fetch_pages({
+                "total_tables": (
+                    total_tables_query, extraction_filter.params, "AND", lambda row: row[:2], total_table_item,
+                ),
+                "tables_not_extracted": (
+                    missing_from.format(columns="days.day, catalog.source, catalog.tablename"),
+                    page_missing_params, "AND", lambda row: row[:3], not_extracted_item,
+                ),
+                "successful_extractions": (success_query, page_params, "HAVING", lambda row: row[:3], success_item),
+                "failed_extractions": (
+                    failed_query, page_params, "HAVING",
+                    lambda row: (row[0], row[1], row[2], row[4], row[5]), failed_item,
+                ),
+            }, DATE_RANGE_PAGE_KEYS, page_limit, page_section, page_key)
+            return {"status": "success", **pages}
+
+        if format == "ndjson":
+            # Each section is read lazily, one server-side cursor at a time
+            return ndjson_response([
+                ("total_tables", stream(
+                    total_tables_query, extraction_filter.params, name="tables_summary_date_range.total_tables",
+                ), total_table_item),
+                ("tables_not_extracted", stream(
+                    missing_query, missing_params, name="tables_summary_date_range.not_extracted",
+                ), not_extracted_item),
+                ("successful_extractions", stream(
+                    success_query, extraction_filter.params, name="tables_summary_date_range.successful",
+                ), success_item),
+                ("failed_extractions", stream(
+                    failed_query, extraction_filter.params, name="tables_summary_date_range.failed",
+                ), failed_item),
+            ])
+
+        # Execute the independent queries concurrently
+        total_tables_data, missing_data, success_data, failed_data = await fetch_many(
+            (total_tables_query, extraction_filter.params, "tables_summary_date_range.total_tables"),
+            (missing_query, missing_params, "tables_summary_date_range.not_extracted"),
+            (success_query, extraction_filter.params, "tables_summary_date_range.successful"),
+            (failed_query, extraction_filter.params, "tables_summary_date_range.failed"),
+        )
+        total_tables_list = [total_table_item(row) for row in total_tables_data]
+        success_result = [success_item(row) for row in success_data]
+        failed_result = [failed_item(row) for row in failed_data]
+
+        # Tables not extracted on each day of the range
+        not_extracted_list = [not_extracted_item(row) for row in missing_data]
+        missing_per_day = {}
+        for row in missing_data:
+            missing_per_day[row[0]] = missing_per_day.get(row[0], 0) + 1
 
         # Return the results as a JSON response
         return {
@@ -259,6 +565,7 @@ def tables_summary_date_range(
             },
             "tables_not_extracted": {
                 "count": len(not_extracted_list),
+                "by_date": [{"date": day, "count": count} for day, count in missing_per_day.items()],
                 "data": not_extracted_list
             },
             "successful_extractions": {
@@ -272,10 +579,53 @@ def tables_summary_date_range(
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
+
+# Metrics of the summary endpoints, in response order, per source table
+SUMMARY_EXTRACTION_COLUMNS = {
+    "total_extracted": "extractedreccount",
+    "total_inserted": "insertedreccount",
+}
+SUMMARY_METRICS_COLUMNS = {
+    "total_insert_open": "InsertOpen",
+    "total_updated_open": "UpdateOpen",
+    "total_all_storage": "AllStorage",
+    "total_delete_non_open": "DeletesNonOpen",
+    "total_open": "Open",
+    "total_non_open": "NonOpen",
+    "total_storage_duplicates": "StorageDuplicates",
+    "total_duplicates": "DiffenDuplicates",
+}
+
+
+async def _fetch_summary_counts(table_info, table1_filter, table2_filter):
+    """
+    Compute every summary metric with one aggregate scan per table, running
+    the extraction-info and DiffenJobMetrics scans concurrently.
+    """
+    extraction_query = f"""
+        SELECT {', '.join(f"SUM({column})" for column in SUMMARY_EXTRACTION_COLUMNS.values())}
+        FROM {table_info['database_2']}.{table_info['table_2']}
+        WHERE {table2_filter.sql}
+    """
+    metrics_query = f"""
+        SELECT {', '.join(f"SUM({column})" for column in SUMMARY_METRICS_COLUMNS.values())}
+        FROM {table_info['database_1']}.{table_info['table_1']}
+        WHERE {table1_filter.sql}
+    """
+    extraction_result, metrics_result = await fetch_many(
+        (extraction_query, table2_filter.params, "summary_counts.extraction"),
+        (metrics_query, table1_filter.params, "summary_counts.metrics"),
+    )
+
+    response = dict(zip(SUMMARY_EXTRACTION_COLUMNS, (value or 0 for value in extraction_result[0])))
+    response.update(zip(SUMMARY_METRICS_COLUMNS, (value or 0 for value in metrics_result[0])))
+    return response
+
 
 @router.get("/summary_counts")
-def summary_counts(
+@cached
+async def summary_counts(
     date: Optional[str] = Query(None, description="Single date in YYYY-MM-DD format"),
     source: Optional[str] = Query(None, description="Filter by source")
 ):
@@ -291,67 +641,22 @@ def summary_counts(
         if date is None:
             date = current_date
 
-        # Base filter conditions for table2 (for db2)
-        table2_filters = []
-        if source and source != "all":
-            table2_filters.append(f"source = '{source}'")
-        table2_filters.append(f"DATE(extractedtime) = '{date}'")
-        table2_filter_condition = " AND ".join(table2_filters) if table2_filters else "1=1"
-
-        # Base filter conditions for table1 (for db1)
-        table1_filters = []
-        if source and source != "all":
-            table1_filters.append(f"source = '{source}'")
-        table1_filters.append(f"DATE(EodMarker) = '{date}'")
-        table1_filter_condition = " AND ".join(table1_filters) if table1_filters else "1=1"
-
-        # Queries for total extracted and inserted counts (use db2.table2)
-        total_extracted_query = f"""
-            SELECT SUM(extractedreccount) AS total_extracted
-            FROM {table_info['database_2']}.{table_info['table_2']}
-            WHERE {table2_filter_condition}
-        """
-        total_inserted_query = f"""
-            SELECT SUM(insertedreccount) AS total_inserted
-            FROM {table_info['database_2']}.{table_info['table_2']}
-            WHERE {table2_filter_condition}
-        """
-
-        # Queries for additional counts (use db1.table1)
-        counts_queries = {
-            "total_insert_open": f"SELECT SUM(InsertOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_updated_open": f"SELECT SUM(UpdateOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_all_storage": f"SELECT SUM(AllStorage) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_delete_non_open": f"SELECT SUM(DeletesNonOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_open": f"SELECT SUM(Open) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_non_open": f"SELECT SUM(NonOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_storage_duplicates": f"SELECT SUM(StorageDuplicates) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_duplicates": f"SELECT SUM(DiffenDuplicates) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}"
-        }
+        # Base filter conditions for table2 (for db2) and table1 (for db1)
+        bounds = day_bounds(parse_date(date))
+        table2_filter = Filter().source(source).between("extractedtime", *bounds)
+        table1_filter = Filter().source(source).between("EodMarker", *bounds)
 
-        # Execute queries and collect results
-        total_extracted = execute_query(total_extracted_query)[0][0] or 0
-        total_inserted = execute_query(total_inserted_query)[0][0] or 0
-
-        other_counts = {}
-        for key, query in counts_queries.items():
-            other_counts[key] = execute_query(query)[0][0] or 0
-
-        # Prepare the response
-        response = {
-            "total_extracted": total_extracted,
-            "total_inserted": total_inserted,
-            **other_counts
-        }
+        response = await _fetch_summary_counts(table_info, table1_filter, table2_filter)
 
         return {"status": "success", "data": response}
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
 
 
 @router.get("/summary_counts_date_range")
-def summary_counts_date_range(
+@cached
+async def summary_counts_date_range(
     from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
     source: Optional[str] = Query(None, description="Filter by source")
@@ -380,217 +685,288 @@ def summary_counts_date_range(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
-        # Base filter conditions for table2 (for db2)
-        table2_filters = []
-        if source and source != "all":
-            table2_filters.append(f"source = '{source}'")
-        table2_filters.append(f"DATE(extractedtime) BETWEEN '{from_date}' AND '{to_date}'")
-        table2_filter_condition = " AND ".join(table2_filters) if table2_filters else "1=1"
-
-        # Base filter conditions for table1 (for db1)
-        table1_filters = []
-        if source and source != "all":
-            table1_filters.append(f"source = '{source}'")
-        table1_filters.append(f"DATE(EodMarker) BETWEEN '{from_date}' AND '{to_date}'")
-        table1_filter_condition = " AND ".join(table1_filters) if table1_filters else "1=1"
-
-        # Queries for total extracted and inserted counts (use db2.table2)
-        total_extracted_query = f"""
-            SELECT SUM(extractedreccount) AS total_extracted
+        # Base filter conditions for table2 (for db2) and table1 (for db1)
+        bounds = span_bounds(parse_date(from_date), parse_date(to_date))
+        table2_filter = Filter().source(source).between("extractedtime", *bounds)
+        table1_filter = Filter().source(source).between("EodMarker", *bounds)
+
+        response = await _fetch_summary_counts(table_info, table1_filter, table2_filter)
+
+        return {"status": "success", "data": response}
+
+    except Exception as e:
+        raise _server_error(e)
+
+
+
+# Upper bound on the days of one batch request
+MAX_BATCH_DATES = 366
+
+
+def _batch_params(sources, dates, from_date, to_date):
+    """
+    Parse the comma-separated ``sources`` and ``dates`` (or the inclusive
+    from_date..to_date range, default today) of a batch request.
+    """
+    source_list = list(dict.fromkeys(name.strip() for name in (sources or "").split(",") if name.strip()))
+    if "all" in source_list:
+        source_list = []
+    try:
+        if dates:
+            days = sorted({parse_date(day.strip()) for day in dates.split(",") if day.strip()})
+        else:
+            start_date = parse_date(from_date) if from_date else today()
+            end_date = parse_date(to_date) if to_date else start_date
+            days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if not days:
+        raise HTTPException(status_code=400, detail="No dates requested; check from_date and to_date.")
+    if len(days) > MAX_BATCH_DATES:
+        raise HTTPException(status_code=400, detail=f"Too many dates: at most {MAX_BATCH_DATES} per request.")
+    return source_list, days
+
+
+def _keyed_by_source_and_date(sources, days, rows, empty):
+    """
+    Nest ``(source, date, values)`` rows as ``{source: {date: values}}`` in
+    calendar order. Every source and requested date is present, with
+    ``empty(source)`` where no rows matched.
+    """
+    found = {(source, day): values for source, day, values in rows}
+    return {
+        source: {
+            day.strftime('%Y-%m-%d'): found.get((source, day.date())) or empty(source)
+            for day in days
+        }
+        for source in sources
+    }
+
+
+@router.get("/batch/summary_counts")
+@cached
+async def batch_summary_counts(
+    sources: Optional[str] = Query(None, description="Comma-separated sources (default: every source)"),
+    dates: Optional[str] = Query(None, description="Comma-separated dates in YYYY-MM-DD format"),
+    from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format, when dates is not given"),
+    to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format, when dates is not given"),
+):
+    """
+    summary_counts for many sources and dates at once, keyed by source and
+    date, from one grouped scan per table.
+    """
+    source_list, days = _batch_params(sources, dates, from_date, to_date)
+
+    try:
+        table_info = get_table_info("db1_db2")
+        table2_filter = Filter().sources(source_list).days("extractedtime", days)
+        table1_filter = Filter().sources(source_list).days("EodMarker", days)
+
+        extraction_query = f"""
+            SELECT source, DATE(extractedtime) AS day,
+                   {', '.join(f"SUM({column})" for column in SUMMARY_EXTRACTION_COLUMNS.values())}
             FROM {table_info['database_2']}.{table_info['table_2']}
-            WHERE {table2_filter_condition}
+            WHERE {table2_filter.sql}
+            GROUP BY source, day
         """
-        total_inserted_query = f"""
-            SELECT SUM(insertedreccount) AS total_inserted
-            FROM {table_info['database_2']}.{table_info['table_2']}
-            WHERE {table2_filter_condition}
+        metrics_query = f"""
+            SELECT source, DATE(EodMarker) AS day,
+                   {', '.join(f"SUM({column})" for column in SUMMARY_METRICS_COLUMNS.values())}
+            FROM {table_info['database_1']}.{table_info['table_1']}
+            WHERE {table1_filter.sql}
+            GROUP BY source, day
         """
+        extraction_rows, metrics_rows = await fetch_many(
+            (extraction_query, table2_filter.params, "batch_summary_counts.extraction"),
+            (metrics_query, table1_filter.params, "batch_summary_counts.metrics"),
+        )
+
+        # Merge the two tables per (source, day)
+        empty = {name: 0 for name in (*SUMMARY_EXTRACTION_COLUMNS, *SUMMARY_METRICS_COLUMNS)}
+        merged = {}
+        for rows, names in ((extraction_rows, SUMMARY_EXTRACTION_COLUMNS), (metrics_rows, SUMMARY_METRICS_COLUMNS)):
+            for source, day, *values in rows:
+                counts = merged.setdefault((source, day), dict(empty))
+                counts.update(zip(names, (value or 0 for value in values)))
+        rows = [(source, day, counts) for (source, day), counts in merged.items()]
+        sources_found = source_list or sorted({source for source, _ in merged})
+
+        data = _keyed_by_source_and_date(sources_found, days, rows, lambda source: dict(empty))
+        return {"status": "success", "data": data}
 
-        # Queries for additional counts (use db1.table1)
-        counts_queries = {
-            "total_insert_open": f"SELECT SUM(InsertOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_updated_open": f"SELECT SUM(UpdateOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_all_storage": f"SELECT SUM(AllStorage) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_delete_non_open": f"SELECT SUM(DeletesNonOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_open": f"SELECT SUM(Open) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_non_open": f"SELECT SUM(NonOpen) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_storage_duplicates": f"SELECT SUM(StorageDuplicates) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}",
-            "total_duplicates": f"SELECT SUM(DiffenDuplicates) FROM {table_info['database_1']}.{table_info['table_1']} WHERE {table1_filter_condition}"
-        }
-
-        # Execute queries and collect results
-        total_extracted = execute_query(total_extracted_query)[0][0] or 0
-        total_inserted = execute_query(total_inserted_query)[0][0] or 0
+    except Exception as e:
+        raise _server_error(e)
 
-        other_counts = {}
-        for key, query in counts_queries.items():
-            other_counts[key] = execute_query(query)[0][0] or 0
 
-        # Prepare the response
-        response = {
-            "total_extracted": total_extracted,
-            "total_inserted": total_inserted,
-            **other_counts
-        }
+@router.get("/batch/tables_summary")
+@cached
+async def batch_tables_summary(
+    sources: Optional[str] = Query(None, description="Comma-separated sources (default: every source)"),
+    dates: Optional[str] = Query(None, description="Comma-separated dates in YYYY-MM-DD format"),
+    from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format, when dates is not given"),
+    to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format, when dates is not given"),
+):
+    """
+    tables_summary_single_date counts for many sources and dates at once,
+    keyed by source and date. The per-day classification is one grouped
+    scan of the requested days; totals come from the in-memory table catalog.
+    """
+    source_list, days = _batch_params(sources, dates, from_date, to_date)
 
-        return {"status": "success", "data": response}
+    try:
+        table_info = get_table_info("db2")
+        table = f"{table_info['database']}.{table_info['table']}"
+        extraction_filter = Filter().sources(source_list).days("extractedtime", days)
+
+        # Tables with any extraction, successful tables and failure groups per day
+        daily_query = f"""
+            SELECT source, DATE(extractedtime) AS day,
+                   COUNT(DISTINCT tablename),
+                   COUNT(DISTINCT CASE WHEN status = 'success' THEN tablename END),
+                   COUNT(DISTINCT CASE WHEN status != 'success'
+                         THEN CONCAT_WS(CHAR(0), tablename, status, status_message) END)
+            FROM {table}
+            WHERE {extraction_filter.sql}
+            GROUP BY source, day
+        """
+        await table_catalog.ensure_loaded()
+        daily_rows = await fetch(daily_query, extraction_filter.params, "batch_tables_summary.daily")
+
+        # Every table ever seen per source, like the single-date summary; a
+        # day may have attempted tables the catalog has not picked up yet
+        catalog = table_catalog.counts()
+        if source_list:
+            catalog = {source: catalog.get(source, 0) for source in source_list}
+        for source, day, attempted, successful, failed in daily_rows:
+            catalog[source] = max(catalog.get(source, 0), attempted)
+        rows = [
+            (source, day, {
+                "total_tables": catalog[source],
+                "tables_not_extracted": catalog[source] - attempted,
+                "successful_extractions": successful,
+                "failed_extractions": failed,
+            })
+            for source, day, attempted, successful, failed in daily_rows
+        ]
+        # Days without any extraction miss every table of the source
+        data = _keyed_by_source_and_date(source_list or sorted(catalog), days, rows, lambda source: {
+            "total_tables": catalog.get(source, 0),
+            "tables_not_extracted": catalog.get(source, 0),
+            "successful_extractions": 0,
+            "failed_extractions": 0,
+        })
+        return {"status": "success", "data": data}
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
+
+
+# Bucket size of each period of the per-period series endpoints
+PERIOD_GRANULARITY = {"daily": "hour", "weekly": "day", "monthly": "day", "yearly": "month"}
+
+
+def _check_date_range(date_range):
+    if date_range not in PERIOD_GRANULARITY:
+        raise HTTPException(status_code=400, detail="Invalid date_range. Choose from 'daily', 'weekly', 'monthly', or 'yearly'.")
+
+
+def _check_breakdown_type(breakdown_type):
+    if breakdown_type not in PERIOD_GRANULARITY:
+        raise HTTPException(status_code=400, detail="Invalid breakdown type")
+
+
+def _period_label(date_range, key):
+    # Bucket labels of inserted_record_counts and allstorage_counts
+    if date_range == "daily":
+        return {"hour": key.hour}
+    if date_range == "weekly":
+        return {"date": key}
+    if date_range == "monthly":
+        return {"day": f"day{key.day}"}
+    return {"month": key.month}
 
 
+def _period_series(date_range, keys, values, value_name):
+    # Series of inserted_record_counts and allstorage_counts
+    return [{**_period_label(date_range, key), value_name: value} for key, value in zip(keys, values)]
+
+
+def _inserted_series(date_range, keys, values):
+    # The weekly series has always been labelled TotalAllStorage
+    return _period_series(date_range, keys, values, "TotalAllStorage" if date_range == "weekly" else "insertedreccount")
+
+
+def _open_non_open_bounds(day, date_range):
+    # Weekly and monthly mean the 7 and 30 days starting at the date
+    if date_range == "weekly":
+        return days_bounds(day, 7)
+    if date_range == "monthly":
+        return days_bounds(day, 30)
+    return period_bounds(day, date_range)
+
+
+def _open_non_open_series(date_range, keys, open_counts, non_open_counts):
+    response_data = []
+    for key, open_count, non_open_count in zip(keys, open_counts, non_open_counts):
+        if date_range == "daily":
+            label = {"date": key.date(), "hour": key.hour}
+        elif date_range == "yearly":
+            label = {"month": key.strftime('%Y-%m')}
+        else:
+            label = {"date": key}
+        response_data.append({**label, "OpenCount": open_count, "NonOpenCount": non_open_count})
+    return response_data
+
+
+def _breakdown_bounds(day, breakdown_type):
+    # Weekly means the 7 days starting at the date, the others the calendar period
+    if breakdown_type == "weekly":
+        return days_bounds(day, 7)
+    return period_bounds(day, breakdown_type)
+
+
+def _percentages(total_open, total_non_open, total_duplicates):
+    # Share of Open, NonOpen and StorageDuplicates, all 0 when there is no data
+    total = total_open + total_non_open + total_duplicates
+    return {
+        "Open": (total_open / total * 100) if total else 0,
+        "Non Open": (total_non_open / total * 100) if total else 0,
+        "Duplicates": (total_duplicates / total * 100) if total else 0
+    }
+
 
 @router.get("/inserted_record_counts")
-def inserted_record_counts(
+@cached
+async def inserted_record_counts(
     date_range: str,  # daily, weekly, monthly, yearly
     source: Optional[str] = Query(None, description="Filter by source"),
     date: str = Query(..., description="Date for filtering (format: YYYY-MM-DD)")
 ):
+    _check_date_range(date_range)
+
     try:
-        # Get database and table info dynamically
-        table_info = get_table_info("db2")
-        
-        # Build filters based on source if provided
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        # Convert the provided date string to a datetime object
-        input_date = datetime.strptime(date, '%Y-%m-%d')
-        
-        # Initialize the query
-        query = ""
-        
-        if date_range == 'daily':
-            # For the daily range
-            filters.append(f"DATE(extractedtime) = '{date}'")
-            query = f"""
-                SELECT HOUR(extractedtime) AS hour, SUM(insertedreccount) AS InsertedCount
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY HOUR(extractedtime)
-                ORDER BY hour
-            """
-        
-        elif date_range == 'weekly':
-            # For the weekly range
-            week_start_date = input_date - timedelta(days=input_date.weekday())  # Get the start of the week
-            week_end_date = week_start_date + timedelta(days=8)  # Get the end of the week
-            filters.append(f"DATE(extractedtime) BETWEEN '{week_start_date.date()}' AND '{week_end_date.date()}'")
-            query = f"""
-                SELECT DATE(extractedtime) AS date, SUM(insertedreccount) AS InsertedCount
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY DATE(extractedtime)
-                ORDER BY date
-            """
-        
-        elif date_range == 'monthly':
-            # For the monthly range
-            month_start_date = input_date.replace(day=1)
-            next_month = input_date.replace(day=28) + timedelta(days=4)  # Go to the next month
-            month_end_date = next_month - timedelta(days=next_month.day)
-            filters.append(f"DATE(extractedtime) BETWEEN '{month_start_date.date()}' AND '{month_end_date.date()}'")
-            query = f"""
-                SELECT DATE(extractedtime) AS date, SUM(insertedreccount) AS InsertedCount
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY DATE(extractedtime)
-                ORDER BY date
-            """
-        
-        elif date_range == 'yearly':
-            year_start_date = input_date.replace(month=1, day=1)
-            year_end_date = input_date.replace(month=12, day=31)
-            filters.append(f"DATE(extractedtime) BETWEEN '{year_start_date.date()}' AND '{year_end_date.date()}'")
-            query = f"""
-                SELECT MONTH(extractedtime) AS month, SUM(insertedreccount) AS InsertedCount
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY MONTH(extractedtime)
-                ORDER BY month
-            """
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid date_range. Choose from 'daily', 'weekly', 'monthly', or 'yearly'.")
-        
-        # Execute the query
-        result = execute_query(query)
-        
-        # For daily data, ensure we return hourly data (0-23)
-        if date_range == "daily":
-            hourly_data = {i: 0 for i in range(24)}  # Initialize with zeros for all 24 hours
-            
-            # Fill in the result data into the hourly_data dictionary
-            for row in result:
-                hourly_data[row[0]] = row[1]  # Populate the result into corresponding hour
-            
-            # Format the response data
-            response_data = [{"hour": hour, "insertedreccount": count} for hour, count in hourly_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For weekly data, ensure we return all days of the week (e.g., Monday-Sunday)
-        if date_range == "weekly":
-            # Get all days in the current week (start from Sunday to Saturday)
-            week_days = [(week_start_date + timedelta(days=i)).date() for i in range(7)]
-            week_data = {day: 0 for day in week_days}  # Initialize with zeros for all days
-            
-            # Map the returned dates to corresponding days of the week
-            for row in result:
-                date = row[0]
-                total_all_storage = row[1]
-                week_data[date] = total_all_storage
-            
-            # Format the response data
-            response_data = [{"date": day, "TotalAllStorage": count} for day, count in week_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For monthly data, ensure we return all days of the month (1-31)
-        if date_range == "monthly":
-            # Get the total number of days in the month
-            total_days_in_month = (month_end_date - month_start_date).days + 1
-            days_of_month = [f"day{day}" for day in range(1, total_days_in_month + 1)]
-            month_data = {day: 0 for day in days_of_month}  # Initialize with zeros for all days
-            
-            # Map the returned dates to corresponding day labels
-            for row in result:
-                date = row[0]
-                inserted_count = row[1]
-                day_of_month = date.day
-                month_data[days_of_month[day_of_month - 1]] = inserted_count
-            
-            # Format the response data
-            response_data = [{"day": day, "insertedreccount": count} for day, count in month_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For yearly data, ensure we return data for all 12 months (January to December)
-        if date_range == "yearly":
-            # Initialize the result data with 0 for all months
-            monthly_data = {i: 0 for i in range(1, 13)}  # Initialize for months 1 to 12
-            
-            # Fill in the result data into the monthly_data dictionary
-            for row in result:
-                monthly_data[row[0]] = row[1]  # Populate the result into corresponding month
-            
-            # Format the response data
-            response_data = [{"month": month, "insertedreccount": count} for month, count in monthly_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # Return other date range data (daily, weekly, yearly)
-        return {"status": "success", "data": result}
+        # Hours of the day, days of the calendar week/month or months of the year
+        bounds = period_bounds(parse_date(date), date_range)
+        keys, series = await timeseries(["insertedreccount"], source, *bounds, PERIOD_GRANULARITY[date_range])
+
+        return {"status": "success", "data": _inserted_series(date_range, keys, series["insertedreccount"])}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
 
 @router.get("/inserted_counts_by_date_range")
-def inserted_counts_by_date_range(
+@cached
+async def inserted_counts_by_date_range(
     from_date: str = Query(..., description="Start date for filtering (format: YYYY-MM-DD)"),
     to_date: str = Query(..., description="End date for filtering (format: YYYY-MM-DD)"),
-    source: Optional[str] = Query(None, description="Filter by source")
+    source: Optional[str] = Query(None, description="Filter by source"),
+    format: str = Query("json", description="Response format: 'json', 'columnar' or 'arrow'"),
 ):
     """
     Fetch record counts for a specified date range.
     """
+    check_format(format)
+
     try:
         # Validate the date formats
         start_date = datetime.strptime(from_date, '%Y-%m-%d')
@@ -599,25 +975,10 @@ def inserted_counts_by_date_range(
         if start_date > end_date:
             raise HTTPException(status_code=400, detail="from_date cannot be after to_date.")
         
-        # Get dynamic table and database info
-        table_info = get_table_info("db2")
-        
-        # Build the base query
-        filters = [f"DATE(extractedtime) BETWEEN '{from_date}' AND '{to_date}'"]
-        
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        query = f"""
-            SELECT DATE(extractedtime) AS date, SUM(insertedreccount) AS InsertedCount
-            FROM {table_info['database']}.{table_info['table']}
-            WHERE {' AND '.join(filters)}
-            GROUP BY DATE(extractedtime)
-            ORDER BY date
-        """
-        
-        # Execute the query
-        result = execute_query(query)
+        # Daily sums, from the analytics backend and rollups where available
+        result = await aggregate("extraction", source, *span_bounds(start_date, end_date), "day", ["insertedreccount"])
+        if format != "json":
+            return tabular_response(format, ("date", "insertedreccount"), result)
         
         # Prepare response data
         response_data = [{"date": row[0], "insertedreccount": row[1]} for row in result]
@@ -628,157 +989,39 @@ def inserted_counts_by_date_range(
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
     except Exception as e:
         # Handle unexpected errors
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
 
 @router.get("/allstorage_counts")
-def allstorage_counts(
+@cached
+async def allstorage_counts(
     date_range: str,  # daily, weekly, monthly, yearly
     source: Optional[str] = Query(None, description="Filter by source"),
     date: str = Query(..., description="Date for filtering (format: YYYY-MM-DD)")
 ):
+    _check_date_range(date_range)
+
     try:
-        # Get database and table info dynamically
-        table_info = get_table_info("db1")
-        
-        # Build filters based on source if provided
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        # Convert the provided date string to a datetime object
-        input_date = datetime.strptime(date, '%Y-%m-%d')
-        
-        # Initialize the query
-        query = ""
-        
-        if date_range == 'daily':
-            # For the daily range
-            filters.append(f"DATE_FORMAT(EodMarker, '%Y-%m-%d') = '{date}'")  # Compare full date (without time)
-            query = f"""
-                SELECT HOUR(EodMarker) AS hour, SUM(AllStorage) AS TotalAllStorage
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY HOUR(EodMarker)
-                ORDER BY hour
-            """
-        
-        elif date_range == 'weekly':
-            # For the weekly range
-            week_start_date = input_date - timedelta(days=input_date.weekday())  # Get the start of the week
-            week_end_date = week_start_date + timedelta(days=6)  # Get the end of the week
-            filters.append(f"DATE(EodMarker) BETWEEN '{week_start_date.date()}' AND '{week_end_date.date()}'")  # Use EodMarker
-            query = f"""
-                SELECT DATE(EodMarker) AS date, SUM(AllStorage) AS TotalAllStorage
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY DATE(EodMarker)
-                ORDER BY date
-            """
-        
-        elif date_range == 'monthly':
-            # For the monthly range
-            month_start_date = input_date.replace(day=1)
-            next_month = input_date.replace(day=28) + timedelta(days=4)  # Go to the next month
-            month_end_date = next_month - timedelta(days=next_month.day)
-            filters.append(f"DATE(EodMarker) BETWEEN '{month_start_date.date()}' AND '{month_end_date.date()}'")  # Use EodMarker
-            query = f"""
-                SELECT DATE(EodMarker) AS date, SUM(AllStorage) AS TotalAllStorage
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY DATE(EodMarker)
-                ORDER BY date
-            """
-        
-        elif date_range == 'yearly':
-            year_start_date = input_date.replace(month=1, day=1)
-            year_end_date = input_date.replace(month=12, day=31)
-            filters.append(f"DATE(EodMarker) BETWEEN '{year_start_date.date()}' AND '{year_end_date.date()}'")  # Use EodMarker
-            query = f"""
-                SELECT MONTH(EodMarker) AS month, SUM(AllStorage) AS TotalAllStorage
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY MONTH(EodMarker)
-                ORDER BY month
-            """
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid date_range. Choose from 'daily', 'weekly', 'monthly', or 'yearly'.")
-        
-        # Execute the query
-        result = execute_query(query)
-        
-        # For daily data, ensure we return hourly data (0-23)
-        if date_range == "daily":
-            hourly_data = {i: 0 for i in range(24)}  # Initialize with zeros for all 24 hours
-            
-            # Fill in the result data into the hourly_data dictionary
-            for row in result:
-                hourly_data[row[0]] = row[1]  # Populate the result into corresponding hour
-            
-            # Format the response data
-            response_data = [{"hour": hour, "TotalAllStorage": count} for hour, count in hourly_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For weekly data, ensure we return all days of the week (e.g., Monday-Sunday)
-        if date_range == "weekly":
-            # Get all days in the current week (start from Sunday to Saturday)
-            week_days = [(week_start_date + timedelta(days=i)).date() for i in range(7)]
-            week_data = {day: 0 for day in week_days}  # Initialize with zeros for all days
-            
-            # Map the returned dates to corresponding days of the week
-            for row in result:
-                date = row[0]
-                total_all_storage = row[1]
-                week_data[date] = total_all_storage
-            
-            # Format the response data
-            response_data = [{"date": day, "TotalAllStorage": count} for day, count in week_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For monthly data, ensure we return all days of the month (1-31)
-        if date_range == "monthly":
-            # Get the total number of days in the month
-            total_days_in_month = (month_end_date - month_start_date).days + 1
-            days_of_month = [f"day{day}" for day in range(1, total_days_in_month + 1)]
-            month_data = {day: 0 for day in days_of_month}  # Initialize with zeros for all days
-            
-            # Map the returned dates to corresponding day labels
-            for row in result:
-                date = row[0]
-                total_all_storage = row[1]
-                day_of_month = date.day
-                month_data[days_of_month[day_of_month - 1]] = total_all_storage
-            
-            # Format the response data
-            response_data = [{"day": day, "TotalAllStorage": count} for day, count in month_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # For yearly data, ensure we return data for all 12 months (January to December)
-        if date_range == "yearly":
-            # Initialize the result data with 0 for all months
-            monthly_data = {i: 0 for i in range(1, 13)}  # Initialize for months 1 to 12
-            
-            # Fill in the result data into the monthly_data dictionary
-            for row in result:
-                monthly_data[row[0]] = row[1]  # Populate the result into corresponding month
-            
-            # Format the response data
-            response_data = [{"month": month, "TotalAllStorage": count} for month, count in monthly_data.items()]
-            return {"status": "success", "data": response_data}
-        
-        # Return other date range data (daily, weekly, yearly)
-        return {"status": "success", "data": result}
+        # Hours of the day, days of the calendar week/month or months of the year
+        bounds = period_bounds(parse_date(date), date_range)
+        keys, series = await timeseries(["AllStorage"], source, *bounds, PERIOD_GRANULARITY[date_range])
+
+        response_data = _period_series(date_range, keys, series["AllStorage"], "TotalAllStorage")
+        return {"status": "success", "data": response_data}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
 
 
 @router.get("/allstorage_date_range")
-def allstorage_date_range(
+@cached
+async def allstorage_date_range(
     from_date: str = Query(..., description="Start date for filtering data (format: YYYY-MM-DD)"),
     to_date: str = Query(..., description="End date for filtering data (format: YYYY-MM-DD)"),
-    source: Optional[str] = Query(None, description="Optional filter by source")
+    source: Optional[str] = Query(None, description="Optional filter by source"),
+    format: str = Query("json", description="Response format: 'json', 'columnar' or 'arrow'"),
 ):
+    check_format(format)
+
     try:
         # Convert the provided date strings to datetime objects
         start_date = datetime.strptime(from_date, '%Y-%m-%d')
@@ -788,25 +1031,10 @@ def allstorage_date_range(
         if start_date > end_date:
             raise HTTPException(status_code=400, detail="Start date cannot be after end date")
         
-        # Get database and table info dynamically
-        table_info = get_table_info("db1")
-
-        # Build filters based on source if provided
-        filters = [f"DATE(EodMarker) BETWEEN '{start_date.date()}' AND '{end_date.date()}'"]
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-
-        # Construct the SQL query to sum the AllStorage by date
-        query = f"""
-            SELECT DATE(EodMarker) AS date, SUM(AllStorage) AS allstorage_count
-            FROM {table_info['database']}.{table_info['table']}
-            WHERE {' AND '.join(filters)}
-            GROUP BY DATE(EodMarker)
-            ORDER BY DATE(EodMarker)
-        """
-
-        # Execute the query
-        result = execute_query(query)
+        # Sum the AllStorage by date, from the analytics backend and rollups where available
+        result = await aggregate("metrics", source, *span_bounds(start_date, end_date), "day", ["AllStorage"])
+        if format != "json":
+            return tabular_response(format, ("date", "allstorage_count"), result)
         
         # Format the response data
         response_data = [{"date": row[0].strftime('%Y-%m-%d'), "allstorage_count": row[1]} for row in result]
@@ -814,204 +1042,48 @@ def allstorage_date_range(
         return {"status": "success", "data": response_data}
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
     
 @router.get("/open_non_open_counts")
-def open_non_open_counts(
+@cached
+async def open_non_open_counts(
     date_range: str,  # "daily", "weekly", "monthly", "yearly"
     source: Optional[str] = Query(None, description="Filter by source"),
     date: str = Query(..., description="Date for filtering (format: YYYY-MM-DD)")
 ):
-    try:
-        # Get database and table info
-        table_info = get_table_info("db1")
-        
-        # Convert input date to a datetime object
-        input_date = datetime.strptime(date, "%Y-%m-%d")
-        
-        # Build the query filters
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        query = ""
-
-        # Define SQL query based on the `date_range`
-        if date_range == "daily":
-            filters.append(f"DATE(EodMarker) = '{date}'")
-            query = f"""
-                SELECT DATE(EodMarker) AS date, HOUR(EodMarker) AS hour, 
-                       SUM(Open) AS OpenCount, SUM(NonOpen) AS NonOpenCount
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE {' AND '.join(filters)}
-                GROUP BY DATE(EodMarker), HOUR(EodMarker)
-                ORDER BY date, hour
-            """
-        
-        elif date_range == "weekly":
-            # Calculate 7 days starting from the input date
-            week_start = input_date
-            week_end = input_date + timedelta(days=6)
-            filters.append(f"DATE(EodMarker) BETWEEN '{week_start.date()}' AND '{week_end.date()}'")
-            query = f"""
-                WITH date_series AS (
-                    SELECT DATE('{week_start.date()}' + INTERVAL (t.n - 1) DAY) AS date
-                    FROM (
-                        SELECT ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS n
-                        FROM information_schema.columns
-                        LIMIT 7
-                    ) t
-                )
-                SELECT 
-                    ds.date, 
-                    COALESCE(SUM(c.Open), 0) AS OpenCount, 
-                    COALESCE(SUM(c.NonOpen), 0) AS NonOpenCount
-                FROM 
-                    date_series ds
-                LEFT JOIN 
-                    {table_info['database']}.{table_info['table']} c 
-                    ON DATE(c.EodMarker) = ds.date 
-                    AND {' AND '.join(filters.replace("EodMarker", "c.EodMarker") for filters in filters)}
-                GROUP BY 
-                    ds.date
-                ORDER BY 
-                    ds.date
-            """
-        
-        elif date_range == "monthly":
-            # Calculate 30 days from the input date
-            month_start = input_date
-            month_end = input_date + timedelta(days=29)
-            filters.append(f"DATE(EodMarker) BETWEEN '{month_start.date()}' AND '{month_end.date()}'")
-            query = f"""
-                WITH date_series AS (
-                    SELECT DATE('{month_start.date()}' + INTERVAL (t.n - 1) DAY) AS date
-                    FROM (
-                        SELECT ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS n
-                        FROM information_schema.columns
-                        LIMIT 30
-                    ) t
-                )
-                SELECT 
-                    ds.date, 
-                    COALESCE(SUM(c.Open), 0) AS OpenCount, 
-                    COALESCE(SUM(c.NonOpen), 0) AS NonOpenCount
-                FROM 
-                    date_series ds
-                LEFT JOIN 
-                    {table_info['database']}.{table_info['table']} c 
-                    ON DATE(c.EodMarker) = ds.date 
-                    AND {' AND '.join(filters.replace("EodMarker", "c.EodMarker") for filters in filters)}
-                GROUP BY 
-                    ds.date
-                ORDER BY 
-                    ds.date
-            """
-        
-        elif date_range == "yearly":
-            # Calculate the start and end of the year
-            year_start = input_date.replace(month=1, day=1)  # Start of the year
-            year_end = input_date.replace(month=12, day=31)  # End of the year
-
-            # Add date filter for the year range
-            filters.append(f"DATE(EodMarker) BETWEEN '{year_start.date()}' AND '{year_end.date()}'")
-            filters_sql = " AND ".join(filters)
-
-            # Generate the SQL query
-            query = f"""
-            WITH RECURSIVE month_series AS (
-                SELECT '{year_start.date()}' AS month
-                UNION ALL
-                SELECT month + INTERVAL 1 MONTH
-                FROM month_series
-                WHERE month < '{year_end.date()}'
-            )
-            SELECT 
-                DATE_FORMAT(ms.month, '%Y-%m') AS month, 
-                COALESCE(SUM(c.Open), 0) AS OpenCount, 
-                COALESCE(SUM(c.NonOpen), 0) AS NonOpenCount
-            FROM 
-                month_series ms
-            LEFT JOIN 
-                {table_info['database']}.{table_info['table']} c 
-                ON YEAR(c.EodMarker) = YEAR(ms.month) 
-                AND MONTH(c.EodMarker) = MONTH(ms.month)
-            WHERE 
-                {filters_sql}
-            GROUP BY 
-                ms.month
-            ORDER BY 
-                ms.month;
-            """
+    _check_date_range(date_range)
 
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid date_range. Choose from 'daily', 'weekly', 'monthly', or 'yearly'.")
-        
-        # Execute the query
-        result = execute_query(query)
-
-        # Format the response for different date ranges
-        if date_range == "daily":
-            response_data = [{"date": row[0], "hour": row[1], "OpenCount": row[2], "NonOpenCount": row[3]} for row in result]
-            for hour in range(24):
-                if not any(d['hour'] == hour for d in response_data):
-                    response_data.append({
-                        "date": date,
-                        "hour": hour,
-                        "OpenCount": 0,
-                        "NonOpenCount": 0
-                    })
-            response_data.sort(key=lambda x: x["hour"])  # Sort by hour
-        elif date_range == "weekly":
-            response_data = [{"date": row[0], "OpenCount": row[1], "NonOpenCount": row[2]} for row in result]
-        elif date_range == "monthly":
-            response_data = [{"date": row[0], "OpenCount": row[1], "NonOpenCount": row[2]} for row in result]
-        else:  # yearly
-            response_data = [{"month": row[0], "OpenCount": row[1], "NonOpenCount": row[2]} for row in result]
+    try:
+        bounds = _open_non_open_bounds(parse_date(date), date_range)
+        keys, series = await timeseries(["Open", "NonOpen"], source, *bounds, PERIOD_GRANULARITY[date_range])
+        response_data = _open_non_open_series(date_range, keys, series["Open"], series["NonOpen"])
         
         # Return the response
         return {"status": "success", "data": response_data}
     
     except Exception as e:
-        logging.error(f"Error processing request: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.exception(f"Error in open_non_open_counts: {str(e)}")
+        raise _server_error(e)
 
 @router.get("/open_non_open_counts_by_date_range")
-def open_non_open_counts_by_date_range(
+@cached
+async def open_non_open_counts_by_date_range(
     from_date: str,  # Start date in format YYYY-MM-DD
     to_date: str,  # End date in format YYYY-MM-DD
-    source: Optional[str] = Query(None, description="Filter by source")
+    source: Optional[str] = Query(None, description="Filter by source"),
+    format: str = Query("json", description="Response format: 'json', 'columnar' or 'arrow'"),
 ):
+    check_format(format)
+
     try:
         # Convert input dates to datetime objects
         start_date = datetime.strptime(from_date, "%Y-%m-%d")
         end_date = datetime.strptime(to_date, "%Y-%m-%d")
         
-        # Get database and table info
-        table_info = get_table_info("db1")
-        
-        # Build the query filters
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        # Add date range filter
-        filters.append(f"DATE(EodMarker) BETWEEN '{start_date.date()}' AND '{end_date.date()}'")
-        
-        # Create SQL query to aggregate counts by date
-        query = f"""
-            SELECT DATE(EodMarker) AS date,
-                   SUM(Open) AS open_count,
-                   SUM(NonOpen) AS non_open_count
-            FROM {table_info['database']}.{table_info['table']}
-            WHERE {' AND '.join(filters)}
-            GROUP BY DATE(EodMarker)
-            ORDER BY date;
-        """
-        
-        # Execute the query
-        result = execute_query(query)
+        # Aggregate counts by date, from the analytics backend and rollups where available
+        result = await aggregate("metrics", source, *span_bounds(start_date, end_date), "day", ["Open", "NonOpen"])
+        if format != "json":
+            return tabular_response(format, ("date", "open_count", "non_open_count"), result)
 
         # Format the response
         response_data = [
@@ -1022,116 +1094,110 @@ def open_non_open_counts_by_date_range(
         return {"status": "success", "data": response_data}
     
     except Exception as e:
-        logging.error(f"Error processing request: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.exception(f"Error in open_non_open_counts_by_date_range: {str(e)}")
+        raise _server_error(e)
+
+
+def _timeseries_request(metrics, granularity, from_date, to_date):
+    """
+    The metric names and ``[start, end)`` of a timeseries request.
+    """
+    metric_names = list(dict.fromkeys(name.strip() for name in metrics.split(",") if name.strip()))
+    unknown = [name for name in metric_names if name not in METRICS]
+    if not metric_names or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid metrics. Choose from {', '.join(METRICS)}.",
+        )
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Invalid granularity. Choose from 'hour', 'day' or 'month'.")
+    try:
+        start_date = parse_date(from_date) if from_date else today()
+        end_date = parse_date(to_date) if to_date else start_date
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="from_date cannot be after to_date.")
+    bounds = span_bounds(start_date, end_date)
+    if bucket_count(*bounds, granularity) > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too large: at most {MAX_BUCKETS} buckets.")
+    return metric_names, bounds
+
+
+@router.get("/timeseries")
+@cached
+async def get_timeseries(
+    metrics: str = Query(..., description="Comma-separated metric columns, e.g. Open,NonOpen"),
+    granularity: str = Query("day", description="Bucket size: hour, day or month"),
+    from_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
+    to_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    source: Optional[str] = Query(None, description="Filter by source"),
+    format: str = Query("json", description="Response format: 'json', 'columnar' or 'arrow'"),
+):
+    """
+    Sum any metric columns per hour, day or month over an inclusive date
+    range. Every bucket of the range is returned, with zeros where no rows exist.
+    """
+    check_format(format)
+    metric_names, bounds = _timeseries_request(metrics, granularity, from_date, to_date)
+
+    try:
+        keys, series = await timeseries(metric_names, source, *bounds, granularity)
+        if format != "json":
+            return column_response(format, {"bucket": keys, **series})
+
+        response_data = [
+            {"bucket": key, **dict(zip(metric_names, values))}
+            for key, *values in zip(keys, *series.values())
+        ]
+        return {"status": "success", "granularity": granularity, "data": response_data}
+
+    except Exception as e:
+        raise _server_error(e)
 
 
 @router.get("/data_breakdown")
-def data_breakdown(
+@cached
+async def data_breakdown(
     source: Optional[str] = Query(None, description="Filter by source"),
     date: Optional[str] = Query(None, description="Base date for analysis in YYYY-MM-DD format"),
     breakdown_type: Optional[str] = Query(None, description="Type of breakdown: daily, weekly, monthly, yearly")
 ):
     try:
-        # Get database and table info dynamically
-        table_info = get_table_info("db1")
-        
-        # Build base filters
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
         # Validate and parse the date
         if date:
             try:
-                base_date = datetime.strptime(date, "%Y-%m-%d")
+                base_date = parse_date(date)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
         else:
-            base_date = datetime.now()
+            base_date = today()
         
-        # Prepare query based on breakdown type
-        if breakdown_type == "daily":
-            # Single percentage for the specific day
-            query = f"""
-                SELECT 
-                    COALESCE(SUM(Open), 0) as total_open, 
-                    COALESCE(SUM(NonOpen), 0) as total_non_open, 
-                    COALESCE(SUM(StorageDuplicates), 0) as total_duplicates
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE DATE(EodMarker) = '{base_date.strftime('%Y-%m-%d')}'
-                {' AND ' + ' AND '.join(filters) if filters else ''}  # Handle filters for source
-            """
-        elif breakdown_type == "weekly":
-            # Single percentage for 7 days starting from the given date
-            query = f"""
-                SELECT 
-                    COALESCE(SUM(Open), 0) as total_open, 
-                    COALESCE(SUM(NonOpen), 0) as total_non_open, 
-                    COALESCE(SUM(StorageDuplicates), 0) as total_duplicates
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE EodMarker BETWEEN 
-                    '{base_date.strftime('%Y-%m-%d')}' 
-                    AND '{(base_date + timedelta(days=6)).strftime('%Y-%m-%d')}'
-                {' AND ' + ' AND '.join(filters) if filters else ''}  # Handle filters for source
-            """
-        elif breakdown_type == "monthly":
-            # Single percentage for the entire month of the given date
-            query = f"""
-                SELECT 
-                    COALESCE(SUM(Open), 0) as total_open, 
-                    COALESCE(SUM(NonOpen), 0) as total_non_open, 
-                    COALESCE(SUM(StorageDuplicates), 0) as total_duplicates
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE 
-                    YEAR(EodMarker) = {base_date.year} 
-                    AND MONTH(EodMarker) = {base_date.month}
-                {' AND ' + ' AND '.join(filters) if filters else ''}  # Handle filters for source
-            """
-        elif breakdown_type == "yearly":
-            # Single percentage for the entire year specified in the input date
-            query = f"""
-                SELECT 
-                    COALESCE(SUM(Open), 0) as total_open, 
-                    COALESCE(SUM(NonOpen), 0) as total_non_open, 
-                    COALESCE(SUM(StorageDuplicates), 0) as total_duplicates
-                FROM {table_info['database']}.{table_info['table']}
-                WHERE 
-                    YEAR(EodMarker) = {base_date.year}
-                {' AND ' + ' AND '.join(filters) if filters else ''}  # Handle filters for source
-            """
-        else:
-            raise HTTPException(status_code=400, detail="Invalid breakdown type")
+        # Resolve the period covered by the breakdown type
+        _check_breakdown_type(breakdown_type)
+        bounds = _breakdown_bounds(base_date, breakdown_type)
         
-        # Execute the query
-        results = execute_query(query)
+        # Sum from the rollups for closed periods and raw rows for the open hour
+        results = [
+            row[1:] for row in await aggregate("metrics", source, *bounds, None, ["Open", "NonOpen", "StorageDuplicates"])
+        ]
         
         # Ensure we have results
         if not results:
             return {"status": "success", "data": {"Open": 0, "Non Open": 0, "Duplicates": 0}}
         
-        # Calculate total and percentages
-        total_open, total_non_open, total_duplicates = results[0]
-        
-        # Handle case where all values might be zero
-        total = total_open + total_non_open + total_duplicates
-        
         # Calculate percentages
-        response_data = {
-            "Open": (total_open / total * 100) if total else 0,
-            "Non Open": (total_non_open / total * 100) if total else 0,
-            "Duplicates": (total_duplicates / total * 100) if total else 0
-        }
-        
-        return {"status": "success", "data": response_data}
+        return {"status": "success", "data": _percentages(*results[0])}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        # Log the full error for debugging
-        print(f"Error in data_breakdown: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.exception(f"Error in data_breakdown: {str(e)}")
+        raise _server_error(e)
 
 @router.get("/data_by_date_range_percentage")
-def data_by_date_range_percentage(
+@cached
+async def data_by_date_range_percentage(
     from_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     to_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     source: Optional[str] = Query(None, description="Filter by source")
@@ -1148,30 +1214,11 @@ def data_by_date_range_percentage(
         if start_date > end_date:
             raise HTTPException(status_code=400, detail="from_date cannot be later than to_date.")
         
-        # Get database and table info dynamically
-        table_info = get_table_info("db1")
-
-        # Build filters based on the provided source
-        filters = []
-        if source and source != "all":
-            filters.append(f"source = '{source}'")
-        
-        # Prepare the query to fetch data for each day in the specified date range
-        query = f"""
-            SELECT 
-                DATE(EodMarker) as date,
-                COALESCE(SUM(Open), 0) as total_open, 
-                COALESCE(SUM(NonOpen), 0) as total_non_open, 
-                COALESCE(SUM(StorageDuplicates), 0) as total_duplicates
-            FROM {table_info['database']}.{table_info['table']}
-            WHERE EodMarker BETWEEN '{start_date.strftime('%Y-%m-%d')}' AND '{end_date.strftime('%Y-%m-%d')}'
-            {' AND ' + ' AND '.join(filters) if filters else ''}  # Handle filters for source
-            GROUP BY DATE(EodMarker)
-            ORDER BY DATE(EodMarker)
-        """
-        
-        # Execute the query
-        results = execute_query(query)
+        # Fetch the totals of each day in the specified date range, from the
+        # analytics backend and rollups where available
+        results = await aggregate(
+            "metrics", source, *span_bounds(start_date, end_date), "day", ["Open", "NonOpen", "StorageDuplicates"],
+        )
 
         # Ensure we have results
         if not results:
@@ -1216,7 +1263,177 @@ def data_by_date_range_percentage(
             }
         }
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error in data_by_date_range_percentage: {str(e)}")
+        raise _server_error(e)
+
+
+@router.get("/dashboard")
+@cached
+async def dashboard(
+    date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (default: today)"),
+    source: Optional[str] = Query(None, description="Filter by source"),
+    date_range: str = Query("daily", description="Period of the series and breakdown: daily, weekly, monthly, yearly"),
+):
+    """
+    Every dashboard widget for one date, source and period: summary_counts,
+    data_breakdown, inserted_record_counts, allstorage_counts and
+    open_non_open_counts, with the same payloads as those endpoints.
+
+    The widgets' periods are covered by one bucketed scan per table (run
+    concurrently) and each payload is derived from slices of that result.
+    """
+    _check_date_range(date_range)
+    try:
+        day = parse_date(date) if date else today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    try:
+        summary_bounds = day_bounds(day)
+        series_bounds = period_bounds(day, date_range)
+        open_non_open_bounds = _open_non_open_bounds(day, date_range)
+        breakdown_bounds = _breakdown_bounds(day, date_range)
+        all_bounds = (summary_bounds, series_bounds, open_non_open_bounds, breakdown_bounds)
+        start, end = min(bounds[0] for bounds in all_bounds), max(bounds[1] for bounds in all_bounds)
+
+        # Yearly series are summed into months from daily buckets so that the
+        # summary day and the breakdown period can be cut from the same scan
+        granularity = "hour" if date_range == "daily" else "day"
+        summary_columns = {**SUMMARY_EXTRACTION_COLUMNS, **SUMMARY_METRICS_COLUMNS}
+        keys, series = await timeseries(list(summary_columns.values()), source, start, end, granularity)
+
+        def totals(bounds):
+            return {metric: sum(values) for metric, values in window(keys, series, *bounds, granularity)[1].items()}
+
+        def buckets(bounds):
+            window_keys, window_series = window(keys, series, *bounds, granularity)
+            return to_months(window_keys, window_series) if date_range == "yearly" else (window_keys, window_series)
+
+        summary = totals(summary_bounds)
+        breakdown = totals(breakdown_bounds)
+        period_keys, period = buckets(series_bounds)
+        open_non_open_keys, open_non_open = buckets(open_non_open_bounds)
+
+        return {
+            "status": "success",
+            "data": {
+                "summary_counts": {name: summary[column] for name, column in summary_columns.items()},
+                "data_breakdown": _percentages(breakdown["Open"], breakdown["NonOpen"], breakdown["StorageDuplicates"]),
+                "inserted_record_counts": _inserted_series(date_range, period_keys, period["insertedreccount"]),
+                "allstorage_counts": _period_series(date_range, period_keys, period["AllStorage"], "TotalAllStorage"),
+                "open_non_open_counts": _open_non_open_series(
+                    date_range, open_non_open_keys, open_non_open["Open"], open_non_open["NonOpen"],
+                ),
+            },
+        }
+
     except Exception as e:
-        # Log the full error for debugging
-        print(f"Error in data_by_date_range_percentage: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise _server_error(e)
+
+
+@router.get("/stream/extractions")
+async def stream_extractions(
+    source: Optional[str] = Query(None, description="Filter by source"),
+):
+    """
+    Server-Sent Events stream of new extractions (successes and failures)
+    as they are recorded. All clients share one poller per process.
+    """
+    return StreamingResponse(
+        extraction_tail.events(source),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/pool_stats")
+def pool_stats():
+    """
+    Report MySQL connection pool utilization and checkout wait metrics, the
+    lag and pools of the read replicas and the prepared-statement cache hits.
+    """
+    return {
+        "status": "success",
+        "data": {**get_pool().stats(), **replica_stats(), "statement_cache": statement_cache_stats()},
+    }
+
+
+@router.get("/admin/cache/stats")
+async def cache_stats():
+    """
+    Report result cache size and hit/miss counters, and how many requests
+    (and DB queries) request coalescing saved.
+    """
+    return {"status": "success", "data": {**result_cache.stats(), "single_flight": single_flight.stats()}}
+
+
+@router.post("/admin/cache/invalidate")
+async def cache_invalidate(
+    source: Optional[str] = Query(None, description="Only drop results for this source"),
+    date: Optional[str] = Query(None, description="Only drop results covering this date (YYYY-MM-DD)"),
+):
+    """
+    Drop cached results, e.g. after a past day has been reloaded.
+    """
+    try:
+        invalidated = result_cache.invalidate(None if source == "all" else source, date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    return {"status": "success", "data": {"invalidated": invalidated}}
+
+
+def _check_date_order(from_date, to_date):
+    if parse_date(from_date) > parse_date(to_date):
+        raise HTTPException(status_code=400, detail="from_date cannot be after to_date.")
+
+
+# Checks the handler of each versioned endpoint runs on its parsed query
+# parameters before reading any data
+REQUEST_CHECKS = {
+    "tables_summary_single_date": lambda p: _page_request(p["limit"], p["cursor"], SINGLE_DATE_PAGE_KEYS),
+    "tables_summary_date_range": lambda p: (
+        _date_range_page_request(p["format"], p["limit"], p["cursor"]), _summary_range(p["from_date"], p["to_date"]),
+    ),
+    "inserted_record_counts": lambda p: _check_date_range(p["date_range"]),
+    "inserted_counts_by_date_range": lambda p: (
+        check_format(p["format"]), _check_date_order(p["from_date"], p["to_date"]),
+    ),
+    "allstorage_counts": lambda p: _check_date_range(p["date_range"]),
+    "allstorage_date_range": lambda p: (check_format(p["format"]), _check_date_order(p["from_date"], p["to_date"])),
+    "open_non_open_counts": lambda p: _check_date_range(p["date_range"]),
+    "open_non_open_counts_by_date_range": lambda p: check_format(p["format"]),
+    "data_breakdown": lambda p: _check_breakdown_type(p["breakdown_type"]),
+    "data_by_date_range_percentage": lambda p: _check_date_order(p["from_date"], p["to_date"]),
+    "timeseries": lambda p: (
+        check_format(p["format"]), _timeseries_request(p["metrics"], p["granularity"], p["from_date"], p["to_date"]),
+    ),
+    "batch/summary_counts": lambda p: _batch_params(p["sources"], p["dates"], p["from_date"], p["to_date"]),
+    "batch/tables_summary": lambda p: _batch_params(p["sources"], p["dates"], p["from_date"], p["to_date"]),
+    "dashboard": lambda p: _check_date_range(p["date_range"]),
+}
+
+
+def valid_request(route, query_params) -> bool:
+    """
+    Whether ``query_params`` pass FastAPI's validation and the
+    REQUEST_CHECKS of the endpoint at ``route`` (its path under /api). The
+    HTTP cache only reads the data version of such requests, so answering a
+    400 costs no query.
+    """
+    endpoint = next(
+        (endpoint for endpoint in router.routes if isinstance(endpoint, APIRoute) and endpoint.path == f"/{route}"),
+        None,
+    )
+    if endpoint is None:
+        return True
+    params, errors = request_params_to_args(endpoint.dependant.query_params, query_params)
+    if errors:
+        return False
+    try:
+        REQUEST_CHECKS.get(route, lambda p: None)(params)
+    except (HTTPException, ValueError, TypeError):
+        return False
+    return True
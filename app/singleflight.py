@@ -0,0 +1,102 @@
+import asyncio
+
+from app.db import query_count
+
+
+class _Call:
+    __slots__ = ("task", "queries", "waiters")
+
+    def __init__(self):
+        self.task = None
+        self.queries = 0
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the
+    leader) starts the computation and later callers wait on it and share its
+    result or exception instead of running it again.
+
+    The computation runs in its own task, so a leader whose client disconnects
+    does not cancel it for the others; it is cancelled (and its queries
+    killed) once every caller has gone away. Coalescing is per process.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.saved_queries = 0
+
+    async def do(self, key, func, shareable=None):
+        """
+        Await ``func()``, or the in-flight call of ``key`` if there is one.
+        A follower whose shared result fails ``shareable`` calls ``func()``
+        itself.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call()
+            call.task = asyncio.ensure_future(self._execute(call, func))
+            call.task.add_done_callback(lambda _: self._finish(key, call))
+            self._calls[key] = call
+            self.executions += 1
+            return await self._wait(key, call)
+
+        try:
+            value = await self._wait(key, call)
+        except Exception:
+            self._coalesce(call)
+            raise
+        if shareable is not None and not shareable(value):
+            return await func()
+        self._coalesce(call)
+        return value
+
+    async def _wait(self, key, call):
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller was cancelled; later calls start afresh
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _coalesce(self, call):
+        # A follower got the leader's outcome without running its queries
+        self.coalesced += 1
+        self.saved_queries += call.queries
+
+    async def _execute(self, call, func):
+        # The task runs in a copy of the leader's context, so the counter
+        # only sees this computation's queries
+        counter = [0]
+        query_count.set(counter)
+        try:
+            return await func()
+        finally:
+            call.queries = counter[0]
+
+    def _finish(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark a failure as retrieved even if every waiter went away
+            call.task.exception()
+
+    def stats(self):
+        calls = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / calls if calls else 0.0,
+            "saved_queries": self.saved_queries,
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import asyncio
+
+from app.rollups import ROLLUP_SOURCES, aggregate
+
+# Every rolled-up additive column can be requested as a metric, keyed by name
+# to the raw table (ROLLUP_SOURCES kind) it is summed from.
+METRICS = {column: kind for kind, spec in ROLLUP_SOURCES.items() for column in spec["columns"]}
+
+GRANULARITIES = ("hour", "day", "month")
+
+# Upper bound on the buckets of one series (about 11 years of hours).
+MAX_BUCKETS = 100_000
+
+_HOUR = timedelta(hours=1)
+
+
+def _origin(start: datetime, granularity: str):
+    # First bucket key, in the type aggregate() returns for the granularity
+    if granularity == "hour":
+        return start.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return start.date()
+    return start.date().replace(day=1)
+
+
+def _bucket_index(key, origin, granularity: str) -> int:
+    if granularity == "hour":
+        return (key - origin) // _HOUR
+    if granularity == "day":
+        return (key - origin).days
+    return (key.year - origin.year) * 12 + key.month - origin.month
+
+
+def bucket_count(start: datetime, end: datetime, granularity: str) -> int:
+    """
+    Number of ``granularity`` buckets touching ``[start, end)``.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Invalid granularity '{granularity}'.")
+    if end <= start:
+        return 0
+    last = _origin(end - timedelta(microseconds=1), granularity)
+    return _bucket_index(last, _origin(start, granularity), granularity) + 1
+
+
+def calendar(start: datetime, end: datetime, granularity: str):
+    """
+    Bucket keys covering ``[start, end)``: datetimes for hours, dates for
+    days and the first day of each month for months.
+    """
+    origin = _origin(start, granularity)
+    count = bucket_count(start, end, granularity)
+    if granularity == "hour":
+        return [origin + _HOUR * i for i in range(count)]
+    if granularity == "day":
+        return [origin + timedelta(days=i) for i in range(count)]
+    return [
+        origin.replace(year=origin.year + (origin.month - 1 + i) // 12, month=(origin.month - 1 + i) % 12 + 1)
+        for i in range(count)
+    ]
+
+
+async def timeseries(metrics, source, start: datetime, end: datetime, granularity: str):
+    """
+    Sum ``metrics`` over ``[start, end)`` per ``granularity`` bucket.
+
+    Metrics of the same table are fetched together in one grouped scan (both
+    tables concurrently), then scattered by bucket index into zero-filled
+    arrays aligned with the calendar. Returns ``(calendar, {metric: values})``.
+    """
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}.")
+    keys = calendar(start, end, granularity)
+
+    by_kind = {}
+    for metric in metrics:
+        by_kind.setdefault(METRICS[metric], []).append(metric)
+    results = await asyncio.gather(*(
+        aggregate(kind, source, start, end, granularity, kind_metrics)
+        for kind, kind_metrics in by_kind.items()
+    ))
+
+    origin = _origin(start, granularity)
+    series = {metric: [0] * len(keys) for metric in metrics}
+    for kind_metrics, rows in zip(by_kind.values(), results):
+        indexes = [_bucket_index(row[0], origin, granularity) for row in rows]
+        for position, metric in enumerate(kind_metrics, start=1):
+            values = series[metric]
+            for index, row in zip(indexes, rows):
+                if 0 <= index < len(values):
+                    values[index] = row[position]
+    return keys, series
+
+
+def window(keys, series, start: datetime, end: datetime, granularity: str):
+    """
+    Slice a calendar and its series to the buckets touching ``[start, end)``.
+    """
+    low = bisect_left(keys, _origin(start, granularity))
+    high = low + bucket_count(start, end, granularity)
+    return keys[low:high], {metric: values[low:high] for metric, values in series.items()}
+
+
+def to_months(keys, series):
+    """
+    Sum a daily calendar and its series into calendar months.
+    """
+    months = []
+    monthly = {metric: [] for metric in series}
+    for index, key in enumerate(keys):
+        month = key.replace(day=1)
+        if not months or months[-1] != month:
+            months.append(month)
+            for values in monthly.values():
+                values.append(0)
+        for metric, values in series.items():
+            monthly[metric][-1] += values[index]
+    return months, monthly
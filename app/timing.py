@@ -0,0 +1,118 @@
+from functools import wraps
+import asyncio
+import contextvars
+import time
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+from app.config import get_query_timing_config
+
+
+class RequestTiming:
+    """
+    Where the time of one request goes. DB time is the wall time during which
+    at least one query was awaited, so concurrent queries are not counted
+    twice; the rest splits at the moment the endpoint returned into handler
+    (Python) time and validation/serialization time.
+    """
+
+    __slots__ = ("started", "endpoint_done", "db", "queries", "_active", "_since")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint_done = None
+        self.db = 0.0
+        self.queries = 0
+        self._active = 0
+        self._since = 0.0
+
+    def db_started(self):
+        if self._active == 0:
+            self._since = time.perf_counter()
+        self._active += 1
+        self.queries += 1
+
+    def db_finished(self):
+        self._active -= 1
+        if self._active == 0:
+            self.db += time.perf_counter() - self._since
+
+    def header(self):
+        now = time.perf_counter()
+        endpoint_done = self.endpoint_done or now
+        handler = max(endpoint_done - self.started - self.db, 0.0)
+        entries = [
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f"app;dur={handler * 1000:.1f}",
+            f"serialize;dur={(now - endpoint_done) * 1000:.1f}",
+            f"total;dur={(now - self.started) * 1000:.1f}",
+        ]
+        return ", ".join(entries)
+
+
+# Timing of the request being served, set by ServerTimingMiddleware. Only ever
+# updated from the event loop (run_db brackets the executor call).
+request_timing = contextvars.ContextVar("request_timing", default=None)
+
+
+def _endpoint_done():
+    timing = request_timing.get()
+    if timing is not None:
+        timing.endpoint_done = time.perf_counter()
+
+
+def _timed(endpoint):
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _endpoint_done()
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _endpoint_done()
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    API route recording when its endpoint returned, which separates handler
+    time from response validation and serialization.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _timed(endpoint), **kwargs)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds a Server-Timing header (db, app, serialize and total durations in
+    milliseconds) to every HTTP response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_query_timing_config()["server_timing"]:
+            return await self.app(scope, receive, send)
+        timing = RequestTiming()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.header())
+                headers["Timing-Allow-Origin"] = "*"
+            await send(message)
+
+        token = request_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timing.reset(token)
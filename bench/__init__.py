@@ -0,0 +1,4 @@
+"""
+Benchmarks: synthetic data generation (bench.generate), load generation and
+reporting (bench.run) and regression checks between reports (bench.compare).
+"""
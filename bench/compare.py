@@ -0,0 +1,76 @@
+"""
+Compare a benchmark report against a baseline and fail on regressions.
+
+    python -m bench.compare baseline.json bench-report.json [--thresholds bench/thresholds.json]
+
+Thresholds are relative changes allowed per metric: 0.25 lets p95 grow by 25%
+and -0.15 lets throughput drop by 15%. Latency changes smaller than
+``min_delta_ms`` are ignored as noise; errors must not grow by more than the
+given count. Exits with status 1 when any route regresses.
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+def _regressed(metric, baseline, current, allowed, min_delta_ms):
+    if baseline is None or current is None:
+        return False
+    if metric == "errors":
+        return current - baseline > allowed
+    if metric.endswith("_ms") and abs(current - baseline) < min_delta_ms:
+        return False
+    if baseline == 0:
+        return current > 0 and allowed >= 0
+    change = (current - baseline) / baseline
+    # Negative thresholds bound a drop (throughput), positive ones a rise
+    return change < allowed if allowed < 0 else change > allowed
+
+
+def compare(baseline, current, thresholds):
+    """
+    Return ``(rows, regressions)`` where each row is ``(route, metric,
+    baseline, current, change, regressed)``.
+    """
+    min_delta_ms = thresholds.get("min_delta_ms", 0.0)
+    rows = []
+    for route, metrics in current["routes"].items():
+        base = baseline["routes"].get(route)
+        if base is None:
+            continue
+        for metric, allowed in thresholds["routes"].items():
+            before, after = base.get(metric), metrics.get(metric)
+            change = (after - before) / before if before and after is not None else None
+            rows.append((route, metric, before, after, change, _regressed(metric, before, after, allowed, min_delta_ms)))
+    if "peak_rss_mb" in thresholds:
+        before, after = baseline.get("peak_rss_mb"), current.get("peak_rss_mb")
+        change = (after - before) / before if before and after is not None else None
+        rows.append(("*", "peak_rss_mb", before, after, change,
+                     _regressed("peak_rss_mb", before, after, thresholds["peak_rss_mb"], 0.0)))
+    return rows, [row for row in rows if row[5]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as baseline, open(args.current) as current, open(args.thresholds) as thresholds:
+        rows, regressions = compare(json.load(baseline), json.load(current), json.load(thresholds))
+
+    for route, metric, before, after, change, regressed in rows:
+        change = "" if change is None else f"{change:+.1%}"
+        print(f"{'REGRESSED' if regressed else 'ok':9} {route:40} {metric:20} {before!s:>12} -> {after!s:>12} {change}")
+    if regressions:
+        print(f"{len(regressions)} regression(s).", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Generate synthetic extraction-info and DiffenJobMetrics data into the MySQL
+server of the app configuration (.env), e.g. the MariaDB container of
+bench/docker-compose.yml.
+
+    python -m bench.generate --sources 5 --tables 200 --days 30 --rows-per-day 96
+
+Every table of every source gets ``--runs-per-day`` extraction attempts per
+day; most succeed, some fail with a recurring error and a few tables are not
+extracted at all. Each source gets ``--rows-per-day`` job-metrics rows per
+day. The same seed always produces the same data.
+"""
+from datetime import date, datetime, timedelta
+import argparse
+import random
+
+import pymysql
+
+from app.config import get_mysql_config
+from app.services import get_table_info
+
+FAILURE_MESSAGES = [
+    "Connection reset by peer",
+    "Lock wait timeout exceeded",
+    "Source file not found",
+    "Schema mismatch: column count differs",
+    None,
+]
+
+BATCH_SIZE = 5000
+
+
+def _tables():
+    metrics = get_table_info("db1")
+    extraction = get_table_info("db2")
+    return (
+        metrics["database"], f"{metrics['database']}.{metrics['table']}",
+        extraction["database"], f"{extraction['database']}.{extraction['table']}",
+    )
+
+
+def create_schema(cursor, drop=False):
+    metrics_db, metrics_table, extraction_db, extraction_table = _tables()
+    for database in {metrics_db, extraction_db}:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+    if drop:
+        cursor.execute(f"DROP TABLE IF EXISTS {metrics_table}")
+        cursor.execute(f"DROP TABLE IF EXISTS {extraction_table}")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {extraction_table} (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            source VARCHAR(255) NOT NULL,
+            tablename VARCHAR(255) NOT NULL,
+            extractedtime DATETIME NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            status_message VARCHAR(1024) NULL,
+            extractedreccount BIGINT NOT NULL DEFAULT 0,
+            insertedreccount BIGINT NOT NULL DEFAULT 0,
+            KEY idx_extractedtime (extractedtime),
+            KEY idx_source_extractedtime (source, extractedtime),
+            KEY idx_source_tablename (source, tablename)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {metrics_table} (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            source VARCHAR(255) NOT NULL,
+            EodMarker DATETIME NOT NULL,
+            InsertOpen BIGINT NOT NULL DEFAULT 0,
+            UpdateOpen BIGINT NOT NULL DEFAULT 0,
+            AllStorage BIGINT NOT NULL DEFAULT 0,
+            DeletesNonOpen BIGINT NOT NULL DEFAULT 0,
+            Open BIGINT NOT NULL DEFAULT 0,
+            NonOpen BIGINT NOT NULL DEFAULT 0,
+            StorageDuplicates BIGINT NOT NULL DEFAULT 0,
+            DiffenDuplicates BIGINT NOT NULL DEFAULT 0,
+            KEY idx_eodmarker (EodMarker),
+            KEY idx_source_eodmarker (source, EodMarker)
+        )
+    """)
+
+
+def extraction_rows(rng, sources, tables, days, runs_per_day, end_date):
+    """
+    Yield ``(source, tablename, extractedtime, status, status_message,
+    extractedreccount, insertedreccount)`` rows, oldest day first.
+    """
+    first_day = end_date - timedelta(days=days - 1)
+    for offset in range(days):
+        day = datetime.combine(first_day + timedelta(days=offset), datetime.min.time())
+        for source in sources:
+            for table in range(tables):
+                # About 3% of the tables are skipped on a given day
+                if rng.random() < 0.03:
+                    continue
+                for _ in range(runs_per_day):
+                    extracted_at = day + timedelta(seconds=rng.randrange(86400))
+                    extracted = rng.randrange(100, 1_000_000)
+                    if rng.random() < 0.9:
+                        yield (source, f"table_{table:05d}", extracted_at, "success", None,
+                               extracted, extracted - rng.randrange(0, 100))
+                    else:
+                        yield (source, f"table_{table:05d}", extracted_at, rng.choice(["failed", "error"]),
+                               rng.choice(FAILURE_MESSAGES), extracted, 0)
+
+
+def metrics_rows(rng, sources, days, rows_per_day, end_date):
+    """
+    Yield job-metrics rows spread evenly over each day, oldest day first.
+    """
+    first_day = end_date - timedelta(days=days - 1)
+    step = 86400 // max(rows_per_day, 1)
+    for offset in range(days):
+        day = datetime.combine(first_day + timedelta(days=offset), datetime.min.time())
+        for source in sources:
+            for row in range(rows_per_day):
+                open_count = rng.randrange(0, 100_000)
+                non_open = rng.randrange(0, 100_000)
+                yield (
+                    source, day + timedelta(seconds=row * step + rng.randrange(step)),
+                    rng.randrange(0, 50_000), rng.randrange(0, 50_000), open_count + non_open,
+                    rng.randrange(0, 10_000), open_count, non_open,
+                    rng.randrange(0, 5_000), rng.randrange(0, 5_000),
+                )
+
+
+def _insert(connection, cursor, query, rows):
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(query, batch)
+            connection.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
+        connection.commit()
+        total += len(batch)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sources", type=int, default=5, help="Number of sources")
+    parser.add_argument("--tables", type=int, default=200, help="Tables per source")
+    parser.add_argument("--days", type=int, default=30, help="Days of history, ending at --end-date")
+    parser.add_argument("--end-date", default=None, help="Last generated day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--runs-per-day", type=int, default=1, help="Extraction attempts per table per day")
+    parser.add_argument("--rows-per-day", type=int, default=96, help="Job-metrics rows per source per day")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Drop and recreate the two tables first")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    end_date = date.fromisoformat(args.end_date) if args.end_date else date.today()
+    sources = [f"source_{index:02d}" for index in range(args.sources)]
+    _, metrics_table, _, extraction_table = _tables()
+
+    connection = pymysql.connect(**get_mysql_config())
+    try:
+        with connection.cursor() as cursor:
+            create_schema(cursor, drop=args.drop)
+            extraction_count = _insert(connection, cursor, f"""
+                INSERT INTO {extraction_table}
+                    (source, tablename, extractedtime, status, status_message, extractedreccount, insertedreccount)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, extraction_rows(rng, sources, args.tables, args.days, args.runs_per_day, end_date))
+            metrics_count = _insert(connection, cursor, f"""
+                INSERT INTO {metrics_table}
+                    (source, EodMarker, InsertOpen, UpdateOpen, AllStorage, DeletesNonOpen,
+                     Open, NonOpen, StorageDuplicates, DiffenDuplicates)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, metrics_rows(rng, sources, args.days, args.rows_per_day, end_date))
+    finally:
+        connection.close()
+    print(f"Inserted {extraction_count} rows into {extraction_table} and {metrics_count} rows into {metrics_table}.")
+
+
+if __name__ == "__main__":
+    main()
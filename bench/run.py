@@ -0,0 +1,264 @@
+"""
+Drive every /api data route with concurrent requests and write a JSON report
+of p50/p95/p99 latency, throughput, queries per request and peak RSS.
+
+    python -m bench.run --requests 200 --concurrency 8 --output bench-report.json
+
+Unless --url is given the app is started with uvicorn in a subprocess (so its
+peak RSS can be read), with the in-process result cache and request
+coalescing disabled so that every request reaches the database; --with-cache
+keeps them. Request parameters are drawn from the sources and days written by
+bench.generate with the same --sources/--days/--end-date.
+"""
+from datetime import date, timedelta
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+METRIC_NAMES = ["Open", "NonOpen", "AllStorage", "insertedreccount"]
+PERIODS = ["daily", "weekly", "monthly", "yearly"]
+
+
+class Context:
+    def __init__(self, sources, days, end_date):
+        self.sources = [f"source_{index:02d}" for index in range(sources)]
+        self.days = [end_date - timedelta(days=offset) for offset in range(days)]
+
+    def source(self, rng):
+        # A quarter of the requests cover every source
+        return None if rng.random() < 0.25 else rng.choice(self.sources)
+
+    def day(self, rng):
+        return rng.choice(self.days).isoformat()
+
+    def span(self, rng, max_days=7):
+        start = rng.randrange(len(self.days))
+        end = max(start - rng.randrange(max_days), 0)
+        return self.days[start].isoformat(), self.days[end].isoformat()
+
+
+def _span_params(rng, ctx, max_days=7, **extra):
+    from_date, to_date = ctx.span(rng, max_days)
+    return {"from_date": from_date, "to_date": to_date, "source": ctx.source(rng), **extra}
+
+
+# route -> request parameters for a random draw
+ROUTES = {
+    "tables_summary_single_date": lambda rng, ctx: {"date": ctx.day(rng), "source": ctx.source(rng)},
+    "tables_summary_date_range": lambda rng, ctx: _span_params(rng, ctx),
+    "summary_counts": lambda rng, ctx: {"date": ctx.day(rng), "source": ctx.source(rng)},
+    "summary_counts_date_range": lambda rng, ctx: _span_params(rng, ctx, 30),
+    "inserted_record_counts": lambda rng, ctx: {
+        "date": ctx.day(rng), "date_range": rng.choice(PERIODS), "source": ctx.source(rng),
+    },
+    "inserted_counts_by_date_range": lambda rng, ctx: _span_params(rng, ctx, 30),
+    "allstorage_counts": lambda rng, ctx: {
+        "date": ctx.day(rng), "date_range": rng.choice(PERIODS), "source": ctx.source(rng),
+    },
+    "allstorage_date_range": lambda rng, ctx: _span_params(rng, ctx, 30),
+    "open_non_open_counts": lambda rng, ctx: {
+        "date": ctx.day(rng), "date_range": rng.choice(PERIODS), "source": ctx.source(rng),
+    },
+    "open_non_open_counts_by_date_range": lambda rng, ctx: _span_params(rng, ctx, 30),
+    "data_breakdown": lambda rng, ctx: {
+        "date": ctx.day(rng), "breakdown_type": rng.choice(PERIODS), "source": ctx.source(rng),
+    },
+    "data_by_date_range_percentage": lambda rng, ctx: _span_params(rng, ctx, 30),
+    "timeseries": lambda rng, ctx: _span_params(
+        rng, ctx, 30, metrics=",".join(rng.sample(METRIC_NAMES, 2)), granularity=rng.choice(["hour", "day"]),
+    ),
+    "batch/summary_counts": lambda rng, ctx: {
+        "sources": ",".join(rng.sample(ctx.sources, min(3, len(ctx.sources)))),
+        "dates": ",".join(rng.sample([day.isoformat() for day in ctx.days], min(5, len(ctx.days)))),
+    },
+    "batch/tables_summary": lambda rng, ctx: {
+        "sources": ",".join(rng.sample(ctx.sources, min(3, len(ctx.sources)))),
+        "dates": ",".join(rng.sample([day.isoformat() for day in ctx.days], min(5, len(ctx.days)))),
+    },
+    "dashboard": lambda rng, ctx: {
+        "date": ctx.day(rng), "date_range": rng.choice(PERIODS), "source": ctx.source(rng),
+    },
+}
+
+_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of ``values`` (sorted).
+    """
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)), 1) - 1]
+
+
+async def run_route(client, route, ctx, rng, requests, concurrency, warmup):
+    draws = [
+        {name: value for name, value in ROUTES[route](rng, ctx).items() if value is not None}
+        for _ in range(warmup + requests)
+    ]
+    for params in draws[:warmup]:
+        await client.get(f"/api/{route}", params=params)
+
+    latencies, queries, errors = [], [], 0
+    pending = iter(draws[warmup:])
+
+    async def worker():
+        nonlocal errors
+        for params in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"/api/{route}", params=params)
+                await response.aread()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+            match = _QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    milliseconds = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": milliseconds(percentile(latencies, 0.50)),
+        "p95_ms": milliseconds(percentile(latencies, 0.95)),
+        "p99_ms": milliseconds(percentile(latencies, 0.99)),
+        "mean_ms": milliseconds(sum(latencies) / len(latencies)) if latencies else None,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def peak_rss_mb(pid):
+    """
+    Peak resident set size of a process (Linux only; None elsewhere).
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env_overrides):
+    port = _free_port()
+    env = {**os.environ, **env_overrides}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The app exited during startup.")
+        try:
+            httpx.get(f"{url}/", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The app did not start within 30 seconds.")
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(url, routes, ctx, args):
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        results = {}
+        for route in routes:
+            results[route] = await run_route(client, route, ctx, rng, args.requests, args.concurrency, args.warmup)
+            print(f"{route}: {json.dumps(results[route])}", file=sys.stderr)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default=None, help="Benchmark a running app instead of starting one")
+    parser.add_argument("--routes", default=None, help="Comma-separated routes (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--sources", type=int, default=5, help="As given to bench.generate")
+    parser.add_argument("--days", type=int, default=30, help="As given to bench.generate")
+    parser.add_argument("--end-date", default=None, help="As given to bench.generate (default: today)")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the result cache and coalescing on")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench-report.json")
+    args = parser.parse_args(argv)
+
+    routes = args.routes.split(",") if args.routes else list(ROUTES)
+    unknown = [route for route in routes if route not in ROUTES]
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(unknown)}")
+    end_date = date.fromisoformat(args.end_date) if args.end_date else date.today()
+    ctx = Context(args.sources, args.days, end_date)
+
+    process, url = None, args.url
+    if url is None:
+        overrides = {} if args.with_cache else {"RESULT_CACHE_ENABLED": "false", "SINGLE_FLIGHT_ENABLED": "false"}
+        process, url = start_server(overrides)
+    try:
+        results = asyncio.run(run(url, routes, ctx, args))
+        rss = peak_rss_mb(process.pid) if process else None
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "peak_rss_mb": rss,
+        "routes": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
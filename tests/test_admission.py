@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app import admission as admission_module
+from app.admission import Admission, AdmissionMiddleware, CostClass
+
+CONFIG = {
+    "enabled": True,
+    "heavy_span_days": 14,
+    "heavy_routes": ["timeseries"],
+    "cheap_limit": 1,
+    "cheap_queue": 0,
+    "heavy_limit": 1,
+    "heavy_queue": 0,
+    "queue_timeout": 1,
+}
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(admission_module, "get_admission_config", lambda: CONFIG)
+
+
+def _app(release):
+    async def handler(request):
+        await release.wait()
+        return JSONResponse({"status": "success"})
+
+    app = Starlette(routes=[Route("/api/summary_counts", handler), Route("/api/health", handler)])
+    app.add_middleware(AdmissionMiddleware, prefix="/api")
+    return app
+
+
+def _requests(app, *paths):
+    async def run():
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=app(release))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            pending = [asyncio.create_task(client.get(path)) for path in paths]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*pending)
+
+    return asyncio.run(run())
+
+
+def test_full_class_answers_429_with_retry_after(config, monkeypatch):
+    cost = CostClass("heavy", limit=1, queue_size=0, queue_timeout=1)
+    monkeypatch.setattr(admission_module.admission, "classify", lambda route, params: cost)
+
+    first, second = _requests(_app, "/api/summary_counts", "/api/summary_counts")
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "1"
+    assert "heavy" in second.json()["detail"]
+    assert cost.stats()["admitted"] == 1 and cost.stats()["rejected"] == 1
+    assert cost.active == 0
+
+
+def test_queued_request_is_admitted_when_a_slot_frees(config, monkeypatch):
+    cost = CostClass("cheap", limit=1, queue_size=1, queue_timeout=1)
+    monkeypatch.setattr(admission_module.admission, "classify", lambda route, params: cost)
+
+    responses = _requests(_app, "/api/summary_counts", "/api/summary_counts", "/api/summary_counts")
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert cost.waiting == 0
+
+
+def test_unlisted_routes_bypass_admission(config, monkeypatch):
+    cost = CostClass("cheap", limit=1, queue_size=0, queue_timeout=1)
+    monkeypatch.setattr(admission_module.admission, "classify", lambda route, params: cost)
+
+    responses = _requests(_app, "/api/health", "/api/health")
+    assert [response.status_code for response in responses] == [200, 200]
+    assert cost.admitted == 0
+
+
+@pytest.mark.parametrize("route, params, expected", [
+    ("timeseries", {"date": "2024-01-01"}, "heavy"),
+    ("summary_counts", {"date": "2024-01-01"}, "cheap"),
+    ("summary_counts_date_range", {"from_date": "2024-01-01", "to_date": "2024-03-01"}, "heavy"),
+    ("summary_counts", {"date": "not-a-date"}, "cheap"),
+])
+def test_classify_by_route_and_span(config, route, params, expected):
+    assert Admission().classify(route, params).name == expected
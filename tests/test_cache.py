@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import pytest
+
+from app import cache
+from app.cache import ResultCache
+from app.queries import parse_date, today
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_open_range_expires_after_ttl(clock):
+    results = ResultCache(open_ttl=30)
+    results.set("key", "value", None, today(), today() + timedelta(days=1))
+
+    clock.now += 29
+    assert results.get("key") == (True, "value")
+    clock.now += 1
+    assert results.get("key") == (False, None)
+    assert results.stats()["entries"] == 0
+
+
+def test_closed_range_lives_until_evicted(clock):
+    results = ResultCache(max_entries=2, open_ttl=30, closed_ttl=0)
+    yesterday = today() - timedelta(days=1)
+    results.set("a", 1, None, yesterday, today())
+    clock.now += 86400
+    assert results.get("a") == (True, 1)
+
+    results.set("b", 2, None, yesterday, today())
+    results.get("a")
+    results.set("c", 3, None, yesterday, today())
+    # "b" was the least recently used
+    assert results.get("b") == (False, None)
+    assert results.get("a") == (True, 1)
+    assert results.stats()["evictions"] == 1
+
+
+def test_invalidate_matches_source_and_day(clock):
+    results = ResultCache()
+    start, end = parse_date("2024-01-01"), parse_date("2024-01-03")
+    results.set("mine", 1, "source_a", start, end)
+    results.set("all_sources", 2, None, start, end)
+    results.set("other", 3, "source_b", start, end)
+    results.set("later", 4, "source_a", end, end + timedelta(days=1))
+
+    assert results.invalidate("source_a", "2024-01-02") == 2
+    assert results.get("mine") == (False, None)
+    assert results.get("all_sources") == (False, None)
+    assert results.get("other") == (True, 3)
+    assert results.get("later") == (True, 4)
+
+    assert results.invalidate() == 2
+    assert results.stats()["entries"] == 0
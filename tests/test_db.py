@@ -0,0 +1,193 @@
+import threading
+
+import pymysql
+import pytest
+
+from app import db
+from app.db import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, **kwargs):
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(db.pymysql, "connect", FakeConnection)
+    return ConnectionPool(
+        {"host": "localhost", "port": 3306, "user": "test", "password": ""},
+        min_size=0, max_size=2, checkout_timeout=0.05, reap_interval=0,
+    )
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["size"] == 2 and stats["in_use"] == 2
+    assert stats["waits"] == 1 and stats["timeouts"] == 1
+
+    pool.release(held.pop())
+    assert pool.acquire() is not None
+    assert pool.stats()["created"] == 2
+
+
+def test_waiting_checkout_gets_a_released_connection(pool):
+    pool.checkout_timeout = 5
+    held = [pool.acquire(), pool.acquire()]
+    threading.Timer(0.05, pool.release, [held[0]]).start()
+    assert pool.acquire() is held[0]
+    assert pool.stats()["timeouts"] == 0
+
+
+def test_connection_is_discarded_after_operational_error(pool):
+    with pytest.raises(pymysql.err.OperationalError):
+        with pool.connection() as raw:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+    assert raw.closed
+    stats = pool.stats()
+    assert stats["size"] == 0 and stats["closed"] == 1
+
+    with pool.connection() as fresh:
+        assert fresh is not raw
+    assert pool.stats()["created"] == 2
+
+
+def test_connection_is_kept_after_statement_error(pool):
+    with pytest.raises(pymysql.err.ProgrammingError):
+        with pool.connection() as raw:
+            raise pymysql.err.ProgrammingError(1064, "You have an error in your SQL syntax")
+    assert not raw.closed
+    assert pool.stats()["idle"] == 1
+
+    with pool.connection() as again:
+        assert again is raw
+
+
+class FakeCursor:
+    """
+    Records the SQL it is given; ``fail`` maps a statement prefix to the
+    error raised for it.
+    """
+
+    def __init__(self, fail=None):
+        self.fail = fail or {}
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        for prefix, error in self.fail.items():
+            if query.startswith(prefix):
+                raise error
+
+    def fetchall(self):
+        return ((1,),)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class FakeServer:
+    def __init__(self, info="8.0.36", statement_cache_size=2):
+        self.info = info
+        self.statements = db.PreparedStatements(statement_cache_size)
+
+    def get_server_info(self):
+        return self.info
+
+
+@pytest.mark.parametrize("query, template", [
+    ("SELECT a FROM t WHERE s = %s AND d >= %s", "SELECT a FROM t WHERE s = ? AND d >= ?"),
+    ("SELECT DATE_FORMAT(d, '%%H:%%i') FROM t WHERE s = %s", "SELECT DATE_FORMAT(d, '%H:%i') FROM t WHERE s = ?"),
+    ("SELECT a FROM t WHERE s LIKE 'x%%'", "SELECT a FROM t WHERE s LIKE 'x%'"),
+])
+def test_placeholders_become_question_marks(query, template):
+    cursor = FakeCursor()
+    db._execute_prepared(FakeServer(), cursor, query, ["value"] * query.count("%s"), None)
+    assert cursor.executed[0] == ("PREPARE stmt_1 FROM %s", [template])
+
+
+def test_cached_template_is_executed_without_preparing_again():
+    connection, cursor = FakeServer(), FakeCursor()
+    query = "SELECT a FROM t WHERE s = %s"
+    assert db._execute_prepared(connection, cursor, query, ["x"], None) == ((1,),)
+    cursor.executed.clear()
+    db._execute_prepared(connection, cursor, query, ["y"], None)
+    assert cursor.executed == [("SET @p0 = %s", ["y"]), ("EXECUTE stmt_1 USING @p0", None)]
+
+
+def test_unsupported_statement_is_remembered_and_run_directly():
+    connection = FakeServer()
+    cursor = FakeCursor({"PREPARE": pymysql.err.OperationalError(1295, "not supported")})
+    assert db._execute_prepared(connection, cursor, "SHOW TABLES", None, None) is None
+    assert db._execute_prepared(connection, cursor, "SHOW TABLES", None, None) is None
+    # The second call did not try to prepare again
+    assert len(cursor.executed) == 1
+
+
+def test_prepared_statement_limit_falls_back_without_remembering():
+    connection = FakeServer()
+    cursor = FakeCursor({"PREPARE": pymysql.err.OperationalError(1461, "max_prepared_stmt_count")})
+    assert db._execute_prepared(connection, cursor, "SELECT 1", None, None) is None
+    assert connection.statements.get("SELECT 1") == (False, None)
+
+
+def test_other_errors_are_raised_without_poisoning_the_cache():
+    connection = FakeServer()
+    cursor = FakeCursor({"PREPARE": pymysql.err.ProgrammingError(1064, "syntax error")})
+    with pytest.raises(pymysql.err.ProgrammingError):
+        db._execute_prepared(connection, cursor, "SELEC 1", None, None)
+    assert connection.statements.get("SELEC 1") == (False, None)
+
+
+def test_failed_execute_deallocates_and_forgets_the_time_limit():
+    connection = FakeServer()
+    cursor = FakeCursor({"EXECUTE": pymysql.err.OperationalError(3024, "maximum statement execution time exceeded")})
+    with pytest.raises(pymysql.err.OperationalError):
+        db._execute_prepared(connection, cursor, "SELECT a FROM t WHERE s = %s", ["x"], 2.0)
+    assert cursor.executed[-1] == ("DEALLOCATE PREPARE stmt_1", None)
+    assert connection.statements.get("SELECT a FROM t WHERE s = %s") == (False, None)
+    assert connection.statements.time_limit == db._UNKNOWN_TIME_LIMIT
+
+
+def test_least_recently_used_statement_is_deallocated():
+    connection, cursor = FakeServer(statement_cache_size=2), FakeCursor()
+    for query in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3"):
+        db._execute_prepared(connection, cursor, query, None, None)
+    assert cursor.executed[-1] == ("DEALLOCATE PREPARE stmt_2", None)
+    assert connection.statements.get("SELECT 2") == (False, None)
+    assert connection.statements.get("SELECT 1") == (True, "stmt_1")
+
+
+@pytest.mark.parametrize("info, assignment, reset", [
+    ("8.0.36", "SESSION max_execution_time = 1500", "SET SESSION max_execution_time = 0"),
+    ("11.4.2-MariaDB", "SESSION max_statement_time = 1.500", "SET SESSION max_statement_time = 0.000"),
+])
+def test_time_limit_is_set_only_when_it_changes(info, assignment, reset):
+    connection, cursor = FakeServer(info), FakeCursor()
+    query = "SELECT a FROM t WHERE s = %s"
+    db._execute_prepared(connection, cursor, query, ["x"], 1.5)
+    assert cursor.executed[1] == (f"SET @p0 = %s, {assignment}", ["x"])
+    assert connection.statements.time_limit == 1.5
+
+    cursor.executed.clear()
+    db._execute_prepared(connection, cursor, query, ["x"], 1.5)
+    assert cursor.executed[0] == ("SET @p0 = %s", ["x"])
+
+    # A direct query afterwards clears the limit first
+    cursor.executed.clear()
+    connection.cursor = lambda: cursor
+    db._reset_time_limit(connection)
+    assert cursor.executed == [(reset, None)]
+    assert connection.statements.time_limit is None
@@ -0,0 +1,87 @@
+from datetime import datetime
+import asyncio
+import time
+
+from app import events
+from app.db import QueryTimeout, query_deadline
+
+
+def test_poller_ignores_the_first_subscribers_query_budget(monkeypatch):
+    """
+    The shared poller keeps delivering events after the budget of the request
+    that started it has run out.
+    """
+    deadlines = []
+
+    async def fetch(query, params=None, name=None):
+        deadline = query_deadline.get()
+        deadlines.append(deadline)
+        if deadline is not None and deadline <= time.monotonic():
+            raise QueryTimeout("Query budget of the request exhausted.")
+        if name == "extraction_tail.mark":
+            return ((datetime(2024, 1, 1),),)
+        return (("source_a", "table_1", datetime(2024, 1, 1, 0, 0, 1), "success", None),)
+
+    monkeypatch.setattr(events, "fetch", fetch)
+    monkeypatch.setattr(events, "get_event_stream_config", lambda: {
+        "batch_size": 1000, "poll_interval": 0.01, "max_queue": 100, "heartbeat": 1,
+    })
+
+    async def main():
+        tail = events.ExtractionTail()
+        # As in a request whose budget has already expired
+        query_deadline.set(time.monotonic() - 1)
+        subscriber = tail.subscribe()
+        try:
+            message = await asyncio.wait_for(subscriber.queue.get(), 1)
+        finally:
+            tail.stop()
+        return message
+
+    message = asyncio.run(main())
+    assert message.startswith("event: extraction")
+    assert deadlines and all(deadline is None for deadline in deadlines)
+
+
+def test_poll_reads_every_row_of_a_second_split_by_the_batch(monkeypatch):
+    """
+    Rows sharing an extractedtime, even the whole key, are all published
+    when a batch ends in the middle of their second.
+    """
+    first, second = datetime(2024, 1, 1, 0, 0, 1), datetime(2024, 1, 1, 0, 0, 2)
+    table = [
+        ("source_a", "table_0", first, "success", None),
+        ("source_a", "table_1", first, "success", None),
+        ("source_a", "table_1", first, "failed", "retry"),
+        ("source_b", "table_1", first, "success", None),
+        ("source_a", "table_2", second, "success", None),
+    ]
+
+    async def fetch(query, params=None, name=None):
+        if name == "extraction_tail.mark":
+            return ((datetime(2024, 1, 1),),)
+        if name == "extraction_tail.poll":
+            mark, limit = params
+            return [row for row in table if row[2] > mark][:limit]
+        (time,) = params
+        return [row for row in table if row[2] == time]
+
+    monkeypatch.setattr(events, "fetch", fetch)
+    monkeypatch.setattr(events, "get_event_stream_config", lambda: {"max_queue": 100})
+    monkeypatch.setattr(events, "get_table_info", lambda name: {"database": "db", "table": "extractions"})
+
+    async def main():
+        tail = events.ExtractionTail()
+        subscriber = events._Subscriber(None)
+        tail._subscribers.add(subscriber)
+        await tail.poll(2)
+        while await tail.poll(2):
+            pass
+        messages = []
+        while not subscriber.queue.empty():
+            messages.append(subscriber.queue.get_nowait())
+        return messages
+
+    messages = asyncio.run(main())
+    assert len(messages) == len(table)
+    assert sum('"status": "failed"' in message for message in messages) == 1
@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import http_cache
+from app.cache import result_cache
+from app.http_cache import HTTPCacheMiddleware
+
+CLOSED = {"from_date": "2024-01-01", "to_date": "2024-01-07"}
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    probes = []
+
+    async def fetch_data_version(route, source, start, end):
+        probes.append((route, source, start, end))
+        return (("2024-01-07 23:59:59", None),)
+
+    monkeypatch.setattr(http_cache, "fetch_data_version", fetch_data_version)
+    monkeypatch.setattr(http_cache, "get_http_cache_config", lambda: {"enabled": True, "closed_max_age": 600})
+    return probes
+
+
+def _client(validate=None):
+    async def handler(request):
+        return JSONResponse({"status": "success"})
+
+    app = Starlette(routes=[
+        Route("/api/summary_counts_date_range", handler),
+        Route("/api/tables_summary_single_date", handler),
+        Route("/api/health", handler),
+    ])
+    app.add_middleware(HTTPCacheMiddleware, prefix="/api", validate=validate)
+    return TestClient(app)
+
+
+def test_closed_range_is_public_and_revalidates_with_304(probes):
+    client = _client()
+    response = client.get("/api/summary_counts_date_range", params=CLOSED)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=600"
+    etag = response.headers["ETag"]
+
+    again = client.get("/api/summary_counts_date_range", params=CLOSED, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+    assert len(probes) == 2
+
+
+def test_open_range_and_whole_history_must_revalidate(probes):
+    client = _client()
+    today = date.today().isoformat()
+    response = client.get("/api/summary_counts_date_range", params={"from_date": today, "to_date": today})
+    assert response.headers["Cache-Control"] == "no-cache"
+    # The table catalog spans every day, so even a closed day changes
+    response = client.get("/api/tables_summary_single_date", params={"date": "2024-01-01"})
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_etag_changes_with_the_params_and_cache_generation(probes):
+    client = _client()
+    etag = client.get("/api/summary_counts_date_range", params=CLOSED).headers["ETag"]
+    other = client.get("/api/summary_counts_date_range", params={**CLOSED, "source": "x"}).headers["ETag"]
+    assert other != etag
+
+    result_cache.invalidate()
+    response = client.get("/api/summary_counts_date_range", params=CLOSED, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_unversioned_and_invalid_requests_skip_the_probe(probes):
+    client = _client(validate=lambda route, params: params.get("source") != "bad")
+    assert "ETag" not in client.get("/api/health").headers
+    assert "ETag" not in client.get("/api/summary_counts_date_range", params={"from_date": "nope"}).headers
+    response = client.get("/api/summary_counts_date_range", params={**CLOSED, "source": "bad"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert probes == []
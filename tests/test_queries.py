@@ -0,0 +1,70 @@
+import base64
+import sqlite3
+
+import pytest
+
+from app.queries import decode_cursor, encode_cursor, keyset_page, keyset_predicate
+
+KEYS = ["source", "table_name"]
+
+# MySQL and SQLite both sort NULL first; <=> is spelled IS in SQLite
+ROWS = [(None, None), (None, "a"), ("", None), ("", "a"), ("x", None), ("x", "a"), ("x", "b")]
+
+
+def _seek(after, limit=50):
+    sql, params = keyset_page("SELECT source, table_name FROM t", [], KEYS, after, limit, clause="WHERE")
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE t (source TEXT, table_name TEXT)")
+    connection.executemany("INSERT INTO t VALUES (?, ?)", ROWS)
+    return connection.execute(sql.replace("<=>", "IS").replace("%s", "?"), params).fetchall()
+
+
+@pytest.mark.parametrize("after, sql, params", [
+    (["x", "a"], "((source > %s) OR (source <=> %s AND table_name > %s))", ["x", "x", "a"]),
+    ([None, "a"], "((source IS NOT NULL) OR (source <=> %s AND table_name > %s))", [None, "a"]),
+    (["", None], "((source > %s) OR (source <=> %s AND table_name IS NOT NULL))", ["", ""]),
+    ([None, None], "((source IS NOT NULL) OR (source <=> %s AND table_name IS NOT NULL))", [None]),
+])
+def test_keyset_predicate(after, sql, params):
+    filters = keyset_predicate(KEYS, after)
+    assert filters.sql == sql
+    assert filters.params == params
+
+
+@pytest.mark.parametrize("after, expected", [
+    (None, ROWS),
+    ([None, None], ROWS[1:]),
+    ([None, "a"], ROWS[2:]),
+    (["", None], ROWS[3:]),
+    (["", "a"], ROWS[4:]),
+    (["x", "b"], []),
+])
+def test_keyset_page_seeks_past_null_and_empty_keys(after, expected):
+    assert _seek(after) == expected
+
+
+def test_keyset_page_fetches_one_extra_row():
+    sql, params = keyset_page("SELECT source, table_name FROM t", ["p"], KEYS, ["x", "a"], limit=2)
+    assert sql.split()[-2:] == ["LIMIT", "%s"]
+    assert params == ["p", "x", "x", "a", 3]
+    assert _seek(None, limit=2) == ROWS[:3]
+
+
+@pytest.mark.parametrize("key", [["x", "a"], [None, "a"], ["", None], ["a b/c", 3]])
+def test_cursor_round_trip(key):
+    assert decode_cursor(encode_cursor("tables", key)) == ("tables", key)
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    "a",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'{"section": "tables"}').decode(),
+    base64.urlsafe_b64encode(b'[1, ["x"]]').decode(),
+    base64.urlsafe_b64encode(b'["tables", "x"]').decode(),
+    base64.urlsafe_b64encode(b'["tables"]').decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
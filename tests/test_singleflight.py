@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("query failed")
+
+    async def ok():
+        return "fresh"
+
+    async def main():
+        outcomes = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        # The failed call is forgotten, so the next one runs again
+        return outcomes, await flight.do("key", ok)
+
+    outcomes, retried = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(outcome, RuntimeError) and str(outcome) == "query failed" for outcome in outcomes)
+    assert retried == "fresh"
+    stats = flight.stats()
+    assert stats["executions"] == 2 and stats["coalesced"] == 2 and stats["in_flight"] == 0
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+
+
+def test_computation_is_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main():
+        waiters = [asyncio.ensure_future(flight.do("key", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert cancelled == [1]
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,63 @@
+from datetime import date, datetime, timedelta
+import asyncio
+
+import pytest
+
+from app import timeseries
+from app.timeseries import bucket_count, calendar, to_months, window
+
+
+def test_hour_buckets_cover_partial_hours_and_exclude_the_end():
+    keys = calendar(datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 2, 1, 0), "hour")
+    assert keys == [datetime(2024, 1, 1, 22), datetime(2024, 1, 1, 23), datetime(2024, 1, 2, 0)]
+    assert bucket_count(datetime(2024, 1, 1, 22, 30), datetime(2024, 1, 2, 1, 0, 1), "hour") == 4
+
+
+def test_day_buckets_cross_month_and_leap_day():
+    keys = calendar(datetime(2024, 2, 28), datetime(2024, 3, 2), "day")
+    assert keys == [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)]
+
+
+def test_month_buckets_cross_the_year():
+    keys = calendar(datetime(2023, 11, 15), datetime(2024, 2, 1), "month")
+    assert keys == [date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1)]
+    assert bucket_count(datetime(2023, 11, 15), datetime(2024, 2, 1, 0, 0, 1), "month") == 4
+
+
+@pytest.mark.parametrize("day", [datetime(2024, 3, 10), datetime(2024, 3, 31), datetime(2024, 11, 3)])
+def test_dst_transition_days_have_24_naive_hours(day):
+    # Stored times are naive local DATETIMEs, grouped by their wall-clock hour
+    keys = calendar(day, day + timedelta(days=1), "hour")
+    assert len(keys) == 24
+    assert keys[2] == day.replace(hour=2)
+    assert all((later - earlier).total_seconds() == 3600 for earlier, later in zip(keys, keys[1:]))
+
+
+def test_empty_range_and_invalid_granularity():
+    assert calendar(datetime(2024, 1, 2), datetime(2024, 1, 1), "day") == []
+    with pytest.raises(ValueError):
+        bucket_count(datetime(2024, 1, 1), datetime(2024, 1, 2), "week")
+
+
+def test_missing_buckets_are_zero_filled(monkeypatch):
+    async def aggregate(kind, source, start, end, granularity, columns):
+        rows = [(date(2024, 1, 2), *range(1, len(columns) + 1)), (date(2024, 1, 4), *[5] * len(columns))]
+        # A row outside the requested range is ignored
+        return rows + [(date(2024, 1, 9), *[9] * len(columns))]
+
+    monkeypatch.setattr(timeseries, "aggregate", aggregate)
+    metric = next(iter(timeseries.METRICS))
+    keys, series = asyncio.run(
+        timeseries.timeseries([metric], None, datetime(2024, 1, 1), datetime(2024, 1, 5), "day")
+    )
+    assert keys == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+    assert series[metric] == [0, 1, 0, 5]
+
+
+def test_window_and_monthly_totals():
+    keys = calendar(datetime(2024, 1, 30), datetime(2024, 2, 3), "day")
+    series = {"metric": [1, 2, 3, 4]}
+    assert window(keys, series, datetime(2024, 1, 31), datetime(2024, 2, 2), "day") == (
+        [date(2024, 1, 31), date(2024, 2, 1)], {"metric": [2, 3]},
+    )
+    assert to_months(keys, series) == ([date(2024, 1, 1), date(2024, 2, 1)], {"metric": [3, 7]})